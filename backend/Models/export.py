@@ -0,0 +1,92 @@
+from flask import current_app
+from bson.objectid import ObjectId
+from threading import Lock
+
+
+# Spreadsheet exports
+# Rows are produced lazily from Mongo cursors so an export never holds the whole
+# collection in memory; residency and block names come from small cached lookups
+# instead of a query per row.
+
+EXPORT_BATCH_SIZE = 1000
+
+APPLICATION_COLUMNS = (
+    "application_id", "username", "residency_id", "residency_name", "status",
+    "preferred_roommate", "disease_status", "created_at",
+)
+REVIEW_COLUMNS = (
+    "review_id", "username", "residency_id", "residency_name", "rating", "review_text", "timestamp",
+)
+OCCUPANCY_COLUMNS = (
+    "residency_id", "residency_name", "block_id", "block_name", "room_id",
+    "room_number", "floor", "capacity", "is_available",
+)
+
+_lock = Lock()
+_residency_names = None
+
+
+def invalidate_residency_names():
+    """
+    Drop the cached residency name lookup after residencies change.
+    """
+    global _residency_names
+    with _lock:
+        _residency_names = None
+
+
+def get_residency_names():
+    """
+    Map residency IDs to names with a single projected query, cached until the next residency write.
+    """
+    global _residency_names
+    with _lock:
+        if _residency_names is None:
+            _residency_names = {
+                str(residency["_id"]): residency.get("Residency", "")
+                for residency in current_app.db["residencies"].find({}, {"Residency": 1})
+            }
+        return _residency_names
+
+
+def _rows(collection_name, query, columns):
+    names = get_residency_names()
+    projection = {"_id": 0, **{column: 1 for column in columns if column != "residency_name"}}
+    cursor = current_app.db[collection_name].find(query, projection).batch_size(EXPORT_BATCH_SIZE)
+    for doc in cursor:
+        doc["residency_name"] = names.get(str(doc.get("residency_id")), "")
+        yield [doc.get(column, "") for column in columns]
+
+
+def iter_application_rows(query):
+    return _rows("applications", query, APPLICATION_COLUMNS)
+
+
+def iter_review_rows(query):
+    return _rows("reviews", query, REVIEW_COLUMNS)
+
+
+def iter_occupancy_rows(residency_id=None):
+    names = get_residency_names()
+    block_query = {"residency_id": ObjectId(residency_id)} if residency_id else {}
+    blocks = {
+        block["_id"]: block
+        for block in current_app.db["blocks"].find(block_query, {"block_name": 1, "residency_id": 1})
+    }
+    room_query = {"block_id": {"$in": list(blocks)}} if residency_id else {}
+    projection = {"block_id": 1, "room_number": 1, "floor": 1, "capacity": 1, "is_available": 1}
+    cursor = current_app.db["rooms"].find(room_query, projection).batch_size(EXPORT_BATCH_SIZE)
+    for room in cursor:
+        block = blocks.get(room.get("block_id"), {})
+        block_residency_id = str(block.get("residency_id", ""))
+        yield [
+            block_residency_id,
+            names.get(block_residency_id, ""),
+            str(room.get("block_id", "")),
+            block.get("block_name", ""),
+            str(room["_id"]),
+            room.get("room_number", ""),
+            room.get("floor", ""),
+            room.get("capacity", ""),
+            room.get("is_available", ""),
+        ]
@@ -0,0 +1,221 @@
+from flask import current_app
+from threading import Lock
+from pymongo.errors import OperationFailure
+from schemas import RESIDENCY_PROJECTION
+import csv
+import heapq
+import math
+import os
+
+
+# Proximity search
+# Residencies may carry an optional GeoJSON `location` point, filled in offline
+# from a local gazetteer (see geocode_residencies.py). Nearest-residency queries
+# use $geoNear on the 2dsphere index, or an in-process k-d tree when the
+# deployment has no geo index (GEO_BACKEND = "kdtree").
+
+EARTH_RADIUS_KM = 6371.0088
+INDEX_NOT_FOUND_CODES = (27, 291)  # IndexNotFound, NoQueryExecutionPlans
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gazetteer.csv")
+
+_gazetteer_lock = Lock()
+_gazetteer = None
+_kdtree_lock = Lock()
+_kdtree = None
+_kdtree_generation = 0  # bumped on every invalidation, so a rebuild that raced a write is dropped
+
+
+def ensure_geo_indexes(db):
+    """
+    Create the 2dsphere index (residencies without a location are skipped by it).
+    """
+    db["residencies"].create_index([("location", "2dsphere")])
+
+
+def invalidate_geo():
+    """
+    Drop the in-process k-d tree after residencies change.
+    """
+    global _kdtree, _kdtree_generation
+    with _kdtree_lock:
+        _kdtree = None
+        _kdtree_generation += 1
+
+
+# Gazetteer
+
+def normalize_place(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def load_gazetteer(path=None):
+    """
+    Read a `name,latitude,longitude` CSV into {normalized name: (lat, lon)}.
+    """
+    places = {}
+    with open(path or DEFAULT_GAZETTEER, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            places[normalize_place(row["name"])] = (float(row["latitude"]), float(row["longitude"]))
+    return places
+
+
+def lookup_place(name):
+    """
+    Resolve a place name (e.g. a university) against the configured gazetteer.
+    Raises RuntimeError when the gazetteer is missing or unreadable.
+    """
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            try:
+                _gazetteer = load_gazetteer(current_app.config.get("GAZETTEER_PATH"))
+            except (OSError, KeyError, ValueError) as e:
+                current_app.logger.error(f"Error loading gazetteer: {e}")
+                raise RuntimeError("Gazetteer unavailable")
+        return _gazetteer.get(normalize_place(name))
+
+
+# Distances
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _to_unit_vector(lat, lon):
+    # Chord length between unit vectors grows monotonically with great-circle
+    # distance, so Euclidean nearest neighbours are also the closest on the globe
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+# k-d tree fallback
+
+class KDTree:
+    """
+    Static 3-d tree over residency unit vectors.
+    """
+
+    def __init__(self, items):
+        # items: [(point, payload)]
+        self.root = self._build(list(items), 0)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        return (
+            items[mid],
+            axis,
+            self._build(items[:mid], depth + 1),
+            self._build(items[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, point, k):
+        """
+        Return up to `k` (squared chord distance, payload) pairs, closest first.
+        """
+        best = []  # max-heap of (-distance, counter, payload)
+        counter = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (node_point, payload), axis, left, right = node
+            distance = sum((a - b) ** 2 for a, b in zip(point, node_point))
+            if len(best) < k:
+                heapq.heappush(best, (-distance, counter, payload))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, counter, payload))
+            counter += 1
+
+            diff = point[axis] - node_point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Visit the far side only if the splitting plane is closer than the current k-th best
+            if len(best) < k or diff * diff < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+        return [(-d, payload) for d, _, payload in sorted(best, reverse=True)]
+
+
+def _get_kdtree():
+    global _kdtree
+    with _kdtree_lock:
+        if _kdtree is not None:
+            return _kdtree
+        generation = _kdtree_generation
+    # Query and build outside the lock so residency writes never wait on a rebuild
+    items = []
+    for residency in current_app.db["residencies"].find({"location": {"$exists": True}}, RESIDENCY_PROJECTION):
+        lon, lat = residency["location"]["coordinates"]
+        residency["_id"] = str(residency["_id"])
+        items.append((_to_unit_vector(lat, lon), residency))
+    tree = KDTree(items)
+    with _kdtree_lock:
+        if _kdtree_generation == generation:
+            _kdtree = tree
+    return tree
+
+
+def _nearest_kdtree(lat, lon, k):
+    results = []
+    for _, residency in _get_kdtree().nearest(_to_unit_vector(lat, lon), k):
+        residency_lon, residency_lat = residency["location"]["coordinates"]
+        results.append(dict(residency, distance_km=haversine_km(lat, lon, residency_lat, residency_lon)))
+    return results
+
+
+def _nearest_mongo(lat, lon, k):
+    pipeline = [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,  # metres -> km
+            "spherical": True,
+        }},
+        {"$limit": k},
+        {"$project": dict(RESIDENCY_PROJECTION, distance_km=1)},
+    ]
+    residencies = list(current_app.db["residencies"].aggregate(pipeline))
+    for residency in residencies:
+        residency["_id"] = str(residency["_id"])
+    return residencies
+
+
+def get_nearest_residencies(lat, lon, k=5):
+    """
+    Fetch the `k` residencies closest to (lat, lon) with their distance in km.
+    """
+    try:
+        if current_app.config.get("GEO_BACKEND", "mongo") == "kdtree":
+            return _nearest_kdtree(lat, lon, k)
+        try:
+            return _nearest_mongo(lat, lon, k)
+        except OperationFailure as e:
+            if e.code not in INDEX_NOT_FOUND_CODES:
+                raise
+            # No 2dsphere index on this deployment
+            current_app.logger.warning(f"$geoNear unavailable, using k-d tree: {e}")
+            return _nearest_kdtree(lat, lon, k)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching nearest residencies: {e}")
+        raise RuntimeError("Failed to fetch nearest residencies")
+
+
+def get_student_university(username):
+    """
+    Fetch the university recorded for a student at registration.
+    """
+    try:
+        user = current_app.db["users"].find_one({"username": username}, {"_id": 1})
+        if not user:
+            return None
+        student = current_app.db["students"].find_one({"user_id": user["_id"]}, {"university": 1})
+        return student.get("university") if student else None
+    except Exception as e:
+        current_app.logger.error(f"Error fetching student university: {e}")
+        raise RuntimeError("Failed to fetch student university")
@@ -1,17 +1,323 @@
-from flask import current_app
+from flask import current_app, has_request_context, request
 from bson.objectid import ObjectId
-from flask_pymongo import PyMongo
+from datetime import datetime, timedelta, timezone
+from contextlib import contextmanager
+import copy
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from Models.stats import ensure_stats_indexes, invalidate_stats
+from Models.geo import ensure_geo_indexes, invalidate_geo
+from Models.export import invalidate_residency_names
+from Models.single_flight import single_flight
+from schemas import (
+    RESIDENCY_PROJECTION,
+    BLOCK_PROJECTION,
+    ROOM_PROJECTION,
+    APPLICATION_PROJECTION,
+    REVIEW_PROJECTION,
+)
+
+
+
+# Change tracking (delta sync)
+# Every write stamps the document with a per-collection monotonic "version" and
+# an "updated_at" timestamp; deletes leave a tombstone carrying the same kind of
+# version so clients can ask for everything that changed after a given version.
+# Versions are reserved before the write commits, so writes can land out of
+# order: each reservation stays listed as pending on the counter until its write
+# has finished, and change queries never read past the lowest pending version.
+# A client starts from the full list, whose X-Sync-Version header is the version
+# to pass as `since` next time (or from since=0, which returns everything).
+
+VERSION_LEASE_SECONDS = 60  # a reservation older than this is treated as abandoned (its writer died)
+VERSIONED_COLLECTIONS = ("residencies", "blocks", "rooms", "applications", "reviews")
+# Key identifying a document in a change response: `changed` entries carry it and
+# `deleted` lists its values, so clients match both with the same field
+CHANGE_ID_FIELDS = {
+    "residencies": "_id",
+    "blocks": "block_id",
+    "rooms": "room_id",
+    "applications": "application_id",
+    "reviews": "review_id",
+}
+BACKFILL_BATCH = 1000
+
+
+def ensure_indexes(db, unique_applications=False):
+    """
+    Create the indexes used by the delta-sync and per-student queries.
+    With `unique_applications`, a student can hold only one application per residency.
+    """
+    for name in ("residencies", "applications", "reviews"):
+        db[name].create_index([("version", ASCENDING)])
+    db["applications"].create_index([("application_id", ASCENDING)])
+    db["reviews"].create_index([("review_id", ASCENDING)])
+    # Trailing fields let the per-student listings be answered from the index alone
+    db["applications"].create_index([("username", ASCENDING), ("created_at", DESCENDING)] + _fields(APPLICATION_SUMMARY_FIELDS))
+    db["reviews"].create_index([("username", ASCENDING), ("timestamp", DESCENDING)] + _fields(REVIEW_SUMMARY_FIELDS))
+    db["blocks"].create_index([("residency_id", ASCENDING), ("version", ASCENDING)])
+    db["rooms"].create_index([("block_id", ASCENDING), ("version", ASCENDING)])
+    db["tombstones"].create_index([("collection", ASCENDING), ("scope", ASCENDING), ("version", ASCENDING)])
+    ensure_stats_indexes(db)
+    ensure_geo_indexes(db)
+    for name in VERSIONED_COLLECTIONS:
+        _backfill_versions(db, name)
+    if unique_applications:
+        db["applications"].create_index(
+            [("username", ASCENDING), ("residency_id", ASCENDING)], unique=True, name="unique_application"
+        )
+
+
+def _fields(names):
+    return [(name, ASCENDING) for name in names]
+
+
+def _reserve_versions(collection_name, count=1, db=None):
+    """
+    Reserve `count` consecutive versions, record them as pending and return the first one.
+    """
+    db = current_app.db if db is None else db
+    seq = {"$ifNull": ["$seq", 0]}
+    counter = db["counters"].find_one_and_update(
+        {"_id": collection_name},
+        [{"$set": {
+            "seq": {"$add": [seq, count]},
+            # Drop the reservations of writers that died, then add this one
+            "pending": {"$concatArrays": [
+                {"$filter": {
+                    "input": {"$ifNull": ["$pending", []]},
+                    "cond": {"$gt": ["$$this.at", {"$subtract": ["$$NOW", VERSION_LEASE_SECONDS * 1000]}]},
+                }},
+                [{"first": {"$add": [seq, 1]}, "at": "$$NOW"}],
+            ]},
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"] - count + 1
+
+
+def _release_versions(collection_name, first):
+    try:
+        current_app.db["counters"].update_one({"_id": collection_name}, {"$pull": {"pending": {"first": first}}})
+    except Exception as e:
+        # The write itself went through; the reservation expires with its lease
+        current_app.logger.warning(f"Error releasing {collection_name} versions from {first}: {e}")
+
+
+@contextmanager
+def stamped(collection_name, *docs):
+    """
+    Stamp `docs` with consecutive versions (one counter round trip) for a write
+    made inside the block; the versions stay pending until the block exits.
+    """
+    first = _reserve_versions(collection_name, len(docs))
+    now = datetime.now(timezone.utc)
+    for offset, data in enumerate(docs):
+        data["version"] = first + offset
+        data["updated_at"] = now
+    try:
+        yield docs
+    finally:
+        _release_versions(collection_name, first)
+
+
+def _backfill_versions(db, collection_name):
+    """
+    Stamp documents written before change tracking existed, so since=0 returns them.
+    """
+    collection = db[collection_name]
+    while True:
+        ids = [doc["_id"] for doc in collection.find({"version": {"$exists": False}}, {"_id": 1}).limit(BACKFILL_BATCH)]
+        if not ids:
+            return
+        first = _reserve_versions(collection_name, len(ids), db=db)
+        now = datetime.now(timezone.utc)
+        try:
+            collection.bulk_write([
+                UpdateOne({"_id": doc_id, "version": {"$exists": False}}, {"$set": {"version": first + offset, "updated_at": now}})
+                for offset, doc_id in enumerate(ids)
+            ], ordered=False)
+        finally:
+            db["counters"].update_one({"_id": collection_name}, {"$pull": {"pending": {"first": first}}})
+
+
+def _visible_version(collection_name):
+    """
+    Highest version up to which every reserved write has finished.
+    """
+    counter = current_app.db["counters"].find_one({"_id": collection_name}) or {}
+    visible = counter.get("seq", 0)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=VERSION_LEASE_SECONDS)
+    for reservation in counter.get("pending", []):
+        reserved_at = reservation["at"]
+        if reserved_at.tzinfo is None:
+            reserved_at = reserved_at.replace(tzinfo=timezone.utc)
+        if reserved_at > cutoff:
+            visible = min(visible, reservation["first"] - 1)
+    return visible
+
+
+def _changed(collection_name):
+    """
+    Hook run after every successful write to `collection_name`.
+    """
+    invalidate_stats(collection_name)
+    if collection_name == "residencies":
+        invalidate_geo()
+        invalidate_residency_names()
 
 
+def _buffered_insert(collection_name, data):
+    """
+    Hand `data` to the write-behind buffer when it is enabled.
+    Returns False when the caller should insert synchronously instead.
+    """
+    buffer = current_app.extensions.get("write_behind")
+    if buffer is None:
+        return False
+    return buffer.submit(collection_name, data)
+
 
-mongo = PyMongo()
+def _record_tombstone(collection_name, doc_id, scope=None):
+    # doc_id is the document's CHANGE_ID_FIELDS value, as the change responses report it
+    _changed(collection_name)
+    tombstone = {"collection": collection_name, "doc_id": doc_id, "scope": scope, "deleted_at": datetime.now(timezone.utc)}
+    with stamped(collection_name, tombstone):
+        current_app.db["tombstones"].insert_one(tombstone)
+
+
+def _changes_since(collection_name, since, serialize, projection, query=None, scope=None):
+    """
+    Return the documents written and the IDs deleted after version `since`,
+    both identified by the collection's `id_field` (see CHANGE_ID_FIELDS).
+    Writes still in progress hold the returned version back, so a client that
+    resumes from it can't skip a write that commits late.
+    """
+    # Read the ceiling first: anything at or below it has already committed
+    versions = {"$gt": since, "$lte": _visible_version(collection_name)}
+    query = dict(query or {})
+    query["version"] = versions
+    cursor = current_app.db[collection_name].find(query, projection).sort("version", ASCENDING)
+    changed = [serialize(doc) for doc in cursor]
+
+    tombstone_query = {"collection": collection_name, "version": versions}
+    if scope is not None:
+        tombstone_query["scope"] = scope
+    tombstones = list(
+        current_app.db["tombstones"].find(tombstone_query, {"doc_id": 1, "version": 1}).sort("version", ASCENDING)
+    )
+
+    version = max([since] + [doc["version"] for doc in changed] + [t["version"] for t in tombstones])
+    return {
+        "changed": changed,
+        "deleted": [t["doc_id"] for t in tombstones],
+        "id_field": CHANGE_ID_FIELDS[collection_name],
+        "version": version,
+    }
+
+
+def get_sync_version(collection_name):
+    """
+    Version to resume delta sync from after a full listing read just after it.
+    Returns None when it can't be read (the listing is then sent without it).
+    """
+    try:
+        return _visible_version(collection_name)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching {collection_name} sync version: {e}")
+        return None
+
+
+def _serialize_with_id(doc):
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def _serialize_block(block):
+    block["block_id"] = str(block["_id"])  # Use block_id instead of _id
+    del block["_id"]  # Remove the original _id field
+    block["residency_id"] = str(block["residency_id"])
+    return block
+
+
+def _serialize_room(room):
+    room["room_id"] = str(room["_id"])  # Use room_id instead of _id
+    del room["_id"]  # Remove the original _id field
+    room["block_id"] = str(room["block_id"])
+    return room
+
+
+# Batch prefetch
+# /batch groups same-collection ID lookups into one $in query per kind and puts
+# the results in the sub-requests' WSGI environ; the getters below check it
+# before querying.
+
+PREFETCH_ENVIRON_KEY = "residency.batch_prefetch"
+
+
+def _prefetched(kind, key):
+    """
+    Return (True, value) when /batch already loaded `key`, else (False, None).
+    """
+    if not has_request_context():
+        return False, None
+    cache = request.environ.get(PREFETCH_ENVIRON_KEY)
+    if not cache or (kind, key) not in cache:
+        return False, None
+    return True, copy.deepcopy(cache[(kind, key)])
+
+
+def _by_ids(collection_name, field, ids, serialize, projection):
+    object_ids = [ObjectId(doc_id) for doc_id in ids if ObjectId.is_valid(doc_id)]
+    docs = current_app.db[collection_name].find({field: {"$in": object_ids}}, projection)
+    return object_ids, [serialize(doc) for doc in docs]
+
+
+def prefetch(lookups):
+    """
+    Load {kind: set of IDs} with one query per kind.
+    Kinds: residency, block, room, blocks_of_residency, rooms_of_block.
+    """
+    cache = {}
+    try:
+        for kind, ids in lookups.items():
+            if kind == "residency":
+                object_ids, docs = _by_ids("residencies", "_id", ids, _serialize_with_id, RESIDENCY_PROJECTION)
+                found = {doc["_id"]: doc for doc in docs}
+            elif kind == "block":
+                object_ids, docs = _by_ids("blocks", "_id", ids, _serialize_block, BLOCK_PROJECTION)
+                found = {doc["block_id"]: doc for doc in docs}
+            elif kind == "room":
+                object_ids, docs = _by_ids("rooms", "_id", ids, _serialize_room, ROOM_PROJECTION)
+                found = {doc["room_id"]: doc for doc in docs}
+            elif kind == "blocks_of_residency":
+                object_ids, docs = _by_ids("blocks", "residency_id", ids, _serialize_block, BLOCK_PROJECTION)
+                found = {str(object_id): [] for object_id in object_ids}
+                for doc in docs:
+                    found[doc["residency_id"]].append(doc)
+            elif kind == "rooms_of_block":
+                object_ids, docs = _by_ids("rooms", "block_id", ids, _serialize_room, ROOM_PROJECTION)
+                found = {str(object_id): [] for object_id in object_ids}
+                for doc in docs:
+                    found[doc["block_id"]].append(doc)
+            else:
+                continue
+            # IDs that were queried but not found are cached as misses too
+            for object_id in object_ids:
+                cache[(kind, str(object_id))] = found.get(str(object_id))
+    except Exception as e:
+        # Sub-requests fall back to their own queries
+        current_app.logger.error(f"Error prefetching batch lookups: {e}")
+    return cache
 
 
 # Residency-related functions
+@single_flight
 def get_all_residencies():
     try:
         collection = current_app.db["residencies"]
-        residencies = list(collection.find())
+        residencies = list(collection.find({}, RESIDENCY_PROJECTION))
         for residency in residencies:
             residency["_id"] = str(residency["_id"])
         return residencies
@@ -19,10 +325,14 @@ def get_all_residencies():
         current_app.logger.error(f"Error fetching residencies: {e}")
         return []
 
+@single_flight
 def get_residency_by_id(residency_id):
+    hit, residency = _prefetched("residency", residency_id)
+    if hit:
+        return residency
     try:
         collection = current_app.db["residencies"]
-        residency = collection.find_one({"_id": ObjectId(residency_id)})
+        residency = collection.find_one({"_id": ObjectId(residency_id)}, RESIDENCY_PROJECTION)
         if residency:
             residency["_id"] = str(residency["_id"])
         return residency
@@ -33,7 +343,10 @@ def get_residency_by_id(residency_id):
 def insert_residency(data):
     try:
         collection = current_app.db["residencies"]
-        return str(collection.insert_one(data).inserted_id)
+        with stamped("residencies", data):
+            inserted_id = str(collection.insert_one(data).inserted_id)
+        _changed("residencies")
+        return inserted_id
     except Exception as e:
         current_app.logger.error(f"Error inserting residency: {e}")
         raise RuntimeError("Failed to insert residency")
@@ -41,7 +354,9 @@ def insert_residency(data):
 def update_residency_in_db(residency_id, data):
     try:
         collection = current_app.db["residencies"]
-        result = collection.update_one({"_id": ObjectId(residency_id)}, {"$set": data})
+        with stamped("residencies", data):
+            result = collection.update_one({"_id": ObjectId(residency_id)}, {"$set": data})
+        _changed("residencies")
         return result.matched_count > 0
     except Exception as e:
         current_app.logger.error(f"Error updating residency: {e}")
@@ -51,21 +366,34 @@ def delete_residency_from_db(residency_id):
     try:
         collection = current_app.db["residencies"]
         result = collection.delete_one({"_id": ObjectId(residency_id)})
+        if result.deleted_count > 0:
+            _record_tombstone("residencies", residency_id)
         return result.deleted_count > 0
     except Exception as e:
         current_app.logger.error(f"Error deleting residency: {e}")
         return False
 
+def get_residency_changes(since):
+    try:
+        return _changes_since("residencies", since, _serialize_with_id, RESIDENCY_PROJECTION)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching residency changes: {e}")
+        raise RuntimeError("Failed to fetch residency changes")
+
 
 # Block-related functions
 
+@single_flight
 def get_blocks_by_residency(residency_id):
     """
     Fetch all blocks associated with a specific residency.
     """
+    hit, blocks = _prefetched("blocks_of_residency", residency_id)
+    if hit:
+        return blocks
     try:
         collection = current_app.db["blocks"]
-        blocks = list(collection.find({"residency_id": ObjectId(residency_id)}))
+        blocks = list(collection.find({"residency_id": ObjectId(residency_id)}, BLOCK_PROJECTION))
         for block in blocks:
             block["block_id"] = str(block["_id"])  # Use block_id instead of _id
             del block["_id"]  # Remove the original _id field
@@ -77,13 +405,17 @@ def get_blocks_by_residency(residency_id):
 
 
 
+@single_flight
 def get_block_by_id(block_id):
     """
     Fetch a block by its block_id.
     """
+    hit, block = _prefetched("block", block_id)
+    if hit:
+        return block
     try:
         collection = current_app.db["blocks"]
-        block = collection.find_one({"_id": ObjectId(block_id)})
+        block = collection.find_one({"_id": ObjectId(block_id)}, BLOCK_PROJECTION)
         if block:
             block["block_id"] = str(block["_id"])  # Use block_id instead of _id
             del block["_id"]  # Remove the original _id field
@@ -100,7 +432,9 @@ def insert_block(data):
     """
     try:
         collection = current_app.db["blocks"]
-        result = collection.insert_one(data)
+        with stamped("blocks", data):
+            result = collection.insert_one(data)
+        _changed("blocks")
         return str(result.inserted_id)
     except Exception as e:
         current_app.logger.error(f"Error inserting block: {e}")
@@ -113,7 +447,9 @@ def update_block_by_id(block_id, data):
     """
     try:
         collection = current_app.db["blocks"]
-        result = collection.update_one({"_id": ObjectId(block_id)}, {"$set": data})
+        with stamped("blocks", data):
+            result = collection.update_one({"_id": ObjectId(block_id)}, {"$set": data})
+        _changed("blocks")
         return result.matched_count > 0
     except Exception as e:
         current_app.logger.error(f"Error updating block by block_id: {e}")
@@ -126,22 +462,42 @@ def delete_block_by_id(block_id):
     """
     try:
         collection = current_app.db["blocks"]
-        result = collection.delete_one({"_id": ObjectId(block_id)})
-        return result.deleted_count > 0
+        block = collection.find_one_and_delete({"_id": ObjectId(block_id)}, {"residency_id": 1})
+        if block:
+            _record_tombstone("blocks", block_id, scope=str(block.get("residency_id")))
+        return block is not None
     except Exception as e:
         current_app.logger.error(f"Error deleting block by block_id: {e}")
         return False
 
 
+def get_block_changes(residency_id, since):
+    """
+    Fetch the blocks of a residency written or deleted after version `since`.
+    """
+    try:
+        return _changes_since(
+            "blocks", since, _serialize_block, BLOCK_PROJECTION,
+            query={"residency_id": ObjectId(residency_id)}, scope=residency_id,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error fetching block changes: {e}")
+        raise RuntimeError("Failed to fetch block changes")
+
+
 # Room-related functions
 
+@single_flight
 def get_rooms_by_block(block_id):
     """
     Fetch all rooms associated with a specific block.
     """
+    hit, rooms = _prefetched("rooms_of_block", block_id)
+    if hit:
+        return rooms
     try:
         collection = current_app.db["rooms"]
-        rooms = list(collection.find({"block_id": ObjectId(block_id)}))
+        rooms = list(collection.find({"block_id": ObjectId(block_id)}, ROOM_PROJECTION))
         for room in rooms:
             room["room_id"] = str(room["_id"])  # Use room_id instead of _id
             del room["_id"]  # Remove the original _id field
@@ -151,13 +507,17 @@ def get_rooms_by_block(block_id):
         current_app.logger.error(f"Error fetching rooms by block: {e}")
         return []
 
+@single_flight
 def get_room_by_id(room_id):
     """
     Fetch a room by its room_id.
     """
+    hit, room = _prefetched("room", room_id)
+    if hit:
+        return room
     try:
         collection = current_app.db["rooms"]
-        room = collection.find_one({"_id": ObjectId(room_id)})
+        room = collection.find_one({"_id": ObjectId(room_id)}, ROOM_PROJECTION)
         if room:
             room["room_id"] = str(room["_id"])  # Use room_id instead of _id
             del room["_id"]  # Remove the original _id field
@@ -173,7 +533,9 @@ def insert_room(data):
     """
     try:
         collection = current_app.db["rooms"]
-        result = collection.insert_one(data)
+        with stamped("rooms", data):
+            result = collection.insert_one(data)
+        _changed("rooms")
         return str(result.inserted_id)
     except Exception as e:
         current_app.logger.error(f"Error inserting room: {e}")
@@ -185,7 +547,9 @@ def update_room_by_id(room_id, data):
     """
     try:
         collection = current_app.db["rooms"]
-        result = collection.update_one({"_id": ObjectId(room_id)}, {"$set": data})
+        with stamped("rooms", data):
+            result = collection.update_one({"_id": ObjectId(room_id)}, {"$set": data})
+        _changed("rooms")
         return result.matched_count > 0
     except Exception as e:
         current_app.logger.error(f"Error updating room by room_id: {e}")
@@ -197,17 +561,35 @@ def delete_room_by_id(room_id):
     """
     try:
         collection = current_app.db["rooms"]
-        result = collection.delete_one({"_id": ObjectId(room_id)})
-        return result.deleted_count > 0
+        room = collection.find_one_and_delete({"_id": ObjectId(room_id)}, {"block_id": 1})
+        if room:
+            _record_tombstone("rooms", room_id, scope=str(room.get("block_id")))
+        return room is not None
     except Exception as e:
         current_app.logger.error(f"Error deleting room by room_id: {e}")
         return False
 
+def get_room_changes(block_id, since):
+    """
+    Fetch the rooms of a block written or deleted after version `since`.
+    """
+    try:
+        return _changes_since(
+            "rooms", since, _serialize_room, ROOM_PROJECTION,
+            query={"block_id": ObjectId(block_id)}, scope=block_id,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error fetching room changes: {e}")
+        raise RuntimeError("Failed to fetch room changes")
+
 # Application-related functions
-def get_all_applications():
+APPLICATION_SUMMARY_FIELDS = ("application_id", "residency_id", "status")
+APPLICATION_FILTERS = ("status", "residency_id")  # query parameters accepted by the list and export endpoints
+
+def get_all_applications(query=None):
     try:
         collection = current_app.db["applications"]
-        applications = list(collection.find())
+        applications = list(collection.find(query or {}, APPLICATION_PROJECTION))
         for application in applications:
             application["_id"] = str(application["_id"])
         return applications
@@ -218,7 +600,7 @@ def get_all_applications():
 def get_application_by_id(application_id):
     try:
         collection = current_app.db["applications"]
-        application = collection.find_one({"_id": ObjectId(application_id)})
+        application = collection.find_one({"_id": ObjectId(application_id)}, APPLICATION_PROJECTION)
         if application:
             application["_id"] = str(application["_id"])
         return application
@@ -232,30 +614,71 @@ def insert_application(data):
         # Assign a custom application_id instead of using MongoDB's default _id
         application_id = str(ObjectId())  # generate a custom ID if needed
         data["application_id"] = application_id  # Set the custom ID in the document
-        collection.insert_one(data)
+        if not _buffered_insert("applications", data):
+            with stamped("applications", data):
+                collection.insert_one(data)
+            _changed("applications")
         return application_id
+    except DuplicateKeyError:
+        raise  # Rejected by the unique (username, residency_id) index
     except Exception as e:
         current_app.logger.error(f"Error inserting application: {e}")
         raise RuntimeError("Failed to insert application")
 
-def delete_application(application_id):
+def get_applications_by_user(username, page=1, per_page=20):
+    """
+    Fetch one page of a student's applications, newest first (covered by the username index).
+    """
+    try:
+        collection = current_app.db["applications"]
+        projection = {"_id": 0, "created_at": 1, **{field: 1 for field in APPLICATION_SUMMARY_FIELDS}}
+        cursor = (
+            collection.find({"username": username}, projection)
+            .sort("created_at", DESCENDING)
+            .skip((page - 1) * per_page)
+            .limit(per_page)
+        )
+        return list(cursor)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching applications for user: {e}")
+        raise RuntimeError("Failed to fetch applications")
+
+def delete_application(application_id, username=None):
+    """
+    Delete an application; with `username`, only if that student owns it.
+    """
     try:
         collection = current_app.db["applications"]
         # Log the application_id to ensure it's being passed correctly
         current_app.logger.info(f"Attempting to delete application with ID: {application_id}")
-        result = collection.delete_one({"application_id": application_id})
+        query = {"application_id": application_id}
+        if username is not None:
+            query["username"] = username  # Ownership is checked by the delete itself
+        result = collection.delete_one(query)
         if result.deleted_count == 0:
             current_app.logger.warning(f"No application found with ID: {application_id}")
+        else:
+            _record_tombstone("applications", application_id)
         return result.deleted_count > 0
     except Exception as e:
         current_app.logger.error(f"Error deleting application: {e}")
         raise RuntimeError("Failed to delete application")
-    
+
+def get_application_changes(since):
+    try:
+        return _changes_since("applications", since, _serialize_with_id, APPLICATION_PROJECTION)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching application changes: {e}")
+        raise RuntimeError("Failed to fetch application changes")
+
 # Review-related functions
-def get_all_reviews():
+REVIEW_SUMMARY_FIELDS = ("review_id", "residency_id", "rating")
+REVIEW_FILTERS = ("residency_id",)
+
+def get_all_reviews(query=None):
     try:
         collection = current_app.db["reviews"]
-        reviews = list(collection.find())
+        reviews = list(collection.find(query or {}, REVIEW_PROJECTION))
         for review in reviews:
             review["_id"] = str(review["_id"])
         return reviews
@@ -266,7 +689,7 @@ def get_all_reviews():
 def get_review_by_id(review_id):
     try:
         collection = current_app.db["reviews"]
-        review = collection.find_one({"_id": ObjectId(review_id)})
+        review = collection.find_one({"_id": ObjectId(review_id)}, REVIEW_PROJECTION)
         if review:
             review["_id"] = str(review["_id"])
         return review
@@ -280,21 +703,57 @@ def insert_review(data):
         # Assign a custom review_id instead of using MongoDB's default _id
         review_id = str(ObjectId())  # generate a custom ID if needed
         data["review_id"] = review_id  # Set the custom ID in the document
-        collection.insert_one(data)
+        if not _buffered_insert("reviews", data):
+            with stamped("reviews", data):
+                collection.insert_one(data)
+            _changed("reviews")
         return review_id
     except Exception as e:
         current_app.logger.error(f"Error inserting review: {e}")
         raise RuntimeError("Failed to insert review")
 
-def delete_review(review_id):
+def get_reviews_by_user(username, page=1, per_page=20):
+    """
+    Fetch one page of a student's reviews, newest first (covered by the username index).
+    """
+    try:
+        collection = current_app.db["reviews"]
+        projection = {"_id": 0, "timestamp": 1, **{field: 1 for field in REVIEW_SUMMARY_FIELDS}}
+        cursor = (
+            collection.find({"username": username}, projection)
+            .sort("timestamp", DESCENDING)
+            .skip((page - 1) * per_page)
+            .limit(per_page)
+        )
+        return list(cursor)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching reviews for user: {e}")
+        raise RuntimeError("Failed to fetch reviews")
+
+def delete_review(review_id, username=None):
+    """
+    Delete a review; with `username`, only if that student owns it.
+    """
     try:
         collection = current_app.db["reviews"]
         # Log the review_id to ensure it's being passed correctly
         current_app.logger.info(f"Attempting to delete review with ID: {review_id}")
-        result = collection.delete_one({"review_id": review_id})
+        query = {"review_id": review_id}
+        if username is not None:
+            query["username"] = username  # Ownership is checked by the delete itself
+        result = collection.delete_one(query)
         if result.deleted_count == 0:
             current_app.logger.warning(f"No review found with ID: {review_id}")
+        else:
+            _record_tombstone("reviews", review_id)
         return result.deleted_count > 0
     except Exception as e:
         current_app.logger.error(f"Error deleting review: {e}")
-        raise RuntimeError("Failed to delete review")
\ No newline at end of file
+        raise RuntimeError("Failed to delete review")
+
+def get_review_changes(since):
+    try:
+        return _changes_since("reviews", since, _serialize_with_id, REVIEW_PROJECTION)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching review changes: {e}")
+        raise RuntimeError("Failed to fetch review changes")
@@ -0,0 +1,81 @@
+from functools import wraps
+from threading import Event, Lock
+import copy
+
+
+# Request coalescing
+# Concurrent calls to a @single_flight getter with the same arguments share one
+# in-flight execution: the first caller runs the query, the others wait for it
+# and receive a copy of its result. Nothing is cached after the call returns.
+
+_lock = Lock()
+_in_flight = {}
+_counters = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+def single_flight(func):
+    """
+    Collapse concurrent identical calls to `func` within this process.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        with _lock:
+            counters = _counters.setdefault(name, {"calls": 0, "queries": 0, "collapsed": 0})
+            counters["calls"] += 1
+            call = _in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _in_flight[key] = _Call()
+                counters["queries"] += 1
+            else:
+                call.followers += 1
+                counters["collapsed"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Each follower gets its own copy so callers can't see each other's edits
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with _lock:
+                del _in_flight[key]
+                followers = call.followers
+            if followers:
+                # Snapshot before handing `result` back, in case our caller mutates it
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    return wrapper
+
+
+def get_single_flight_stats():
+    """
+    Per-getter counts of calls, queries actually run and calls collapsed into another's query.
+    """
+    with _lock:
+        return {name: dict(counters) for name, counters in _counters.items()}
@@ -0,0 +1,128 @@
+from flask import current_app
+from threading import Lock
+import time
+
+
+# Dashboard statistics
+# Each statistic is computed with a $group pipeline and cached in-process for a
+# short TTL. Writes to a collection drop every cached statistic that reads it.
+
+DEFAULT_STATS_TTL = 30  # seconds
+
+_cache = {}
+_generations = {}  # bumped on invalidation so a slow computation can't re-cache stale data
+_cache_lock = Lock()
+
+# Statistic name -> collections it is computed from
+_DEPENDENCIES = {
+    "applications": ("applications",),
+    "occupancy": ("rooms", "blocks"),
+    "reviews": ("reviews",),
+}
+
+
+def ensure_stats_indexes(db):
+    """
+    Create the indexes that cover the dashboard pipelines.
+    """
+    db["applications"].create_index([("residency_id", 1), ("status", 1)])
+    db["rooms"].create_index([("block_id", 1), ("is_available", 1), ("capacity", 1)])
+    db["reviews"].create_index([("residency_id", 1), ("rating", 1)])
+
+
+def invalidate_stats(collection_name):
+    """
+    Drop the cached statistics that depend on `collection_name`.
+    """
+    with _cache_lock:
+        for name, collections in _DEPENDENCIES.items():
+            if collection_name in collections:
+                _cache.pop(name, None)
+                _generations[name] = _generations.get(name, 0) + 1
+
+
+def _cached(name, compute):
+    ttl = current_app.config.get("STATS_CACHE_TTL", DEFAULT_STATS_TTL)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(name)
+        if entry and now - entry[0] < ttl:
+            return entry[1]
+        generation = _generations.get(name, 0)
+    value = compute()
+    with _cache_lock:
+        if _generations.get(name, 0) == generation:
+            _cache[name] = (now, value)
+    return value
+
+
+def _application_stats():
+    pipeline = [
+        {"$sort": {"residency_id": 1, "status": 1}},  # lets the planner walk the covering index
+        {"$group": {"_id": {"residency_id": "$residency_id", "status": "$status"}, "count": {"$sum": 1}}},
+    ]
+    by_status = {}
+    by_residency = {}
+    for row in current_app.db["applications"].aggregate(pipeline):
+        status = row["_id"].get("status")
+        residency_id = str(row["_id"].get("residency_id"))
+        by_status[status] = by_status.get(status, 0) + row["count"]
+        by_residency.setdefault(residency_id, {})[status] = row["count"]
+    return {"by_status": by_status, "by_residency": by_residency}
+
+
+def _occupancy_stats():
+    pipeline = [
+        {"$sort": {"block_id": 1, "is_available": 1}},
+        {"$group": {
+            "_id": "$block_id",
+            "rooms": {"$sum": 1},
+            "available_rooms": {"$sum": {"$cond": ["$is_available", 1, 0]}},
+            "capacity": {"$sum": "$capacity"},
+        }},
+    ]
+    by_block = {}
+    for row in current_app.db["rooms"].aggregate(pipeline):
+        block_id = str(row.pop("_id"))
+        row["occupied_rooms"] = row["rooms"] - row["available_rooms"]
+        by_block[block_id] = row
+
+    # Roll blocks up to their residency with one projected query instead of a $lookup per block
+    by_residency = {}
+    for block in current_app.db["blocks"].find({}, {"residency_id": 1}):
+        counts = by_block.get(str(block["_id"]))
+        if not counts:
+            continue
+        totals = by_residency.setdefault(
+            str(block["residency_id"]),
+            {"rooms": 0, "available_rooms": 0, "occupied_rooms": 0, "capacity": 0},
+        )
+        for key in totals:
+            totals[key] += counts[key]
+    return {"by_block": by_block, "by_residency": by_residency}
+
+
+def _review_stats():
+    pipeline = [
+        {"$sort": {"residency_id": 1}},
+        {"$group": {"_id": "$residency_id", "count": {"$sum": 1}, "average_rating": {"$avg": "$rating"}}},
+    ]
+    return {
+        str(row["_id"]): {"count": row["count"], "average_rating": row["average_rating"]}
+        for row in current_app.db["reviews"].aggregate(pipeline)
+    }
+
+
+def get_dashboard_stats():
+    """
+    Fetch the admin dashboard counts, served from the cache when fresh.
+    """
+    try:
+        return {
+            "applications": _cached("applications", _application_stats),
+            "occupancy": _cached("occupancy", _occupancy_stats),
+            "reviews": _cached("reviews", _review_stats),
+        }
+    except Exception as e:
+        current_app.logger.error(f"Error computing dashboard stats: {e}")
+        raise RuntimeError("Failed to compute dashboard stats")
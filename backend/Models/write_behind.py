@@ -0,0 +1,158 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from Models.residency import stamped
+from Models.stats import invalidate_stats
+
+
+# Write-behind buffer for application and review inserts
+# Requests enqueue their document and a background thread flushes batches with
+# insert_many (group commit). Each request waits until its batch has been written,
+# so nothing is acknowledged that exists only in this process's memory.
+
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_MAX_BATCH = 500
+DEFAULT_WINDOW_MS = 5
+DEFAULT_ENQUEUE_TIMEOUT = 1.0  # seconds a request may block on a full queue
+
+_STOP = object()
+
+
+class _Pending:
+    def __init__(self, collection_name, data):
+        self.collection_name = collection_name
+        self.data = data
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteBehindBuffer:
+    """
+    Bounded queue of pending inserts drained by a single flusher thread.
+    """
+
+    def __init__(self, app, max_queue=DEFAULT_MAX_QUEUE, max_batch=DEFAULT_MAX_BATCH,
+                 window_ms=DEFAULT_WINDOW_MS, enqueue_timeout=DEFAULT_ENQUEUE_TIMEOUT):
+        self.app = app
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_started(self):
+        # Started lazily and restarted after fork: threads don't survive fork()
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, collection_name, data):
+        """
+        Queue `data` for insertion into `collection_name` and wait for its batch to be written.
+        Returns False when the queue stayed full (the caller should write synchronously).
+        """
+        self._ensure_started()
+        pending = _Pending(collection_name, data)
+        try:
+            # Blocking put: a full queue slows producers down before it rejects them
+            self._queue.put(pending, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.app.logger.warning(f"Write-behind queue full, writing {collection_name} synchronously")
+            return False
+
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_collection = {}
+        for pending in batch:
+            by_collection.setdefault(pending.collection_name, []).append(pending)
+
+        with self.app.app_context():
+            for collection_name, pendings in by_collection.items():
+                docs = [pending.data for pending in pendings]
+                errors = {}
+                try:
+                    with stamped(collection_name, *docs):
+                        self.app.db[collection_name].insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    # Unordered insert: only the documents listed in writeErrors failed
+                    for write_error in e.details.get("writeErrors", []):
+                        if write_error.get("code") == 11000:
+                            errors[write_error["index"]] = DuplicateKeyError(write_error.get("errmsg"), 11000)
+                        else:
+                            errors[write_error["index"]] = RuntimeError(f"Failed to insert {collection_name}")
+                    self.app.logger.error(f"{len(errors)} of {len(docs)} {collection_name} inserts failed")
+                except Exception as e:
+                    self.app.logger.error(f"Error flushing {len(docs)} {collection_name} inserts: {e}")
+                    errors = {index: RuntimeError(f"Failed to insert {collection_name}") for index in range(len(docs))}
+                if len(errors) < len(docs):
+                    invalidate_stats(collection_name)
+                for index, pending in enumerate(pendings):
+                    pending.error = errors.get(index)
+                    pending.done.set()
+
+    def close(self, timeout=10):
+        """
+        Flush everything still queued and stop the flusher thread.
+        """
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+def init_write_behind(app):
+    """
+    Enable the write-behind buffer when WRITE_BEHIND is set in the app config.
+    """
+    if not app.config.get("WRITE_BEHIND"):
+        return None
+    buffer = WriteBehindBuffer(
+        app,
+        max_queue=app.config.get("WRITE_BEHIND_MAX_QUEUE", DEFAULT_MAX_QUEUE),
+        max_batch=app.config.get("WRITE_BEHIND_MAX_BATCH", DEFAULT_MAX_BATCH),
+        window_ms=app.config.get("WRITE_BEHIND_WINDOW_MS", DEFAULT_WINDOW_MS),
+        enqueue_timeout=app.config.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", DEFAULT_ENQUEUE_TIMEOUT),
+    )
+    app.extensions["write_behind"] = buffer
+    atexit.register(buffer.close)
+    return buffer
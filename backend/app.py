@@ -1,30 +1,84 @@
-from flask import Flask
-from flask_cors import CORS
-from pymongo import MongoClient
-from ressources.residency import ResidencyBlueprint
-from ressources.auth import auth
+import os
+from flask import Flask, g
 
-def create_app():
-    app = Flask(__name__)
-    CORS(app)  # Enable CORS for all routes
+# Blueprints, models and the MongoDB driver are imported inside create_app and
+# on first use, so importing this module (e.g. from gunicorn.conf.py) stays cheap.
+
+class ResidencyApp(Flask):
+    """
+    Flask app whose `user` (set by token_required) lives on `g`, so threaded
+    workers and concurrent /batch sub-requests never share it, and whose `db`
+    connects on first use in each process.
+    """
+
+    _db = None
+    _db_pid = None
+
+    @property
+    def user(self):
+        return g.get("user")
+
+    @user.setter
+    def user(self, value):
+        g.user = value
+
+    @property
+    def db(self):
+        # MongoClient is not fork-safe: reconnect in a forked worker
+        if self._db is None or self._db_pid != os.getpid():
+            from db import connect_db
+            connect_db(self)
+        return self._db
+
+    @db.setter
+    def db(self, value):
+        self._db = value
+        self._db_pid = os.getpid() if value is not None else None
+
+
+def create_app(connect=True):
+    """
+    Build the Flask app. The MongoDB connection is opened on first use; with
+    connect=True (development) the indexes are also created up front.
+    Pre-fork servers pass connect=False (see gunicorn.conf.py).
+    """
+    from flask_cors import CORS
+    from compression import init_compression
+
+    app = ResidencyApp(__name__)
+    CORS(app, expose_headers=["X-Sync-Version"])  # Enable CORS for all routes; let clients read the delta-sync cursor
+    init_compression(app)  # gzip/brotli for large JSON and CSV responses
 
     # Application Configuration
     app.config["PROPAGATE_EXCEPTIONS"] = True
-    app.config["API_TITLE"] = "Residency API"
-    app.config["API_VERSION"] = "v1"
-    app.config["OPENAPI_VERSION"] = "3.0.3"
-    app.config["OPENAPI_URL_PREFIX"] = "/"
-    app.config["OPENAPI_SWAGGER_UI_PATH"] = "/swagger-ui"
-    app.config["OPENAPI_SWAGGER_UI_URL"] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
+    from ressources.auth import auth
     app.register_blueprint(auth, url_prefix="/auth")    #import the auth blueprint and initialize it
     app.config["SECRET_KEY"] = "******"    # include a secret key for JWT
+    app.config["WRITE_BEHIND"] = False    # batch application/review inserts in a background thread
+    app.config["GEO_BACKEND"] = "mongo"    # "kdtree" for deployments without a 2dsphere index
+    app.config["UNIQUE_APPLICATIONS"] = False    # reject a second application to the same residency via a unique index
+    app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb+srv://<username>:<password>@cluster0.pgrad.mongodb.net")
+    app.config["MONGO_DBNAME"] = "residency_db"
+    app.config["BATCH_WORKERS"] = 8    # threads running /batch sub-requests concurrently
+    app.config["BATCH_ALLOW_WRITES"] = False    # allow POST/PUT/DELETE sub-requests in /batch
 
     # MongoDB Setup
-    client = MongoClient("mongodb+srv://<username>:<password>@cluster0.pgrad.mongodb.net")
-    app.db = client["residency_db"]  # Attach the database to the Flask app for use in other parts
+    if connect:
+        from db import ensure_db_indexes
+        ensure_db_indexes(app)
+    from Models.write_behind import init_write_behind
+    init_write_behind(app)
 
     # Register Residency Blueprint
+    from ressources.residency import ResidencyBlueprint
+    from ressources.export import ExportBlueprint
+    from ressources.batch import BatchBlueprint
+    from ressources.health import HealthBlueprint
     app.register_blueprint(ResidencyBlueprint)
+    app.register_blueprint(ExportBlueprint, url_prefix="/export")
+    app.register_blueprint(BatchBlueprint)
+    app.register_blueprint(HealthBlueprint)
+
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import os
+import random
+import time
+
+from flask import Flask
+from pymongo import MongoClient
+
+from Models.geo import get_nearest_residencies, invalidate_geo
+
+# Compares $geoNear on the 2dsphere index with the in-process k-d tree.
+# Usage: MONGO_URI=mongodb://localhost:27017 python bench_geo.py
+
+QUERIES = int(os.environ.get("BENCH_QUERIES", 2000))
+RESIDENCIES = int(os.environ.get("BENCH_RESIDENCIES", 5000))
+K = 5
+
+# Rough bounding box of Tunisia
+LAT_RANGE = (30.2, 37.5)
+LON_RANGE = (7.5, 11.6)
+
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def make_app():
+    app = Flask(__name__)
+    client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    app.db = client["residency_bench"]
+    collection = app.db["residencies"]
+    collection.drop()
+    rng = random.Random(1)
+    docs = []
+    for i in range(RESIDENCIES):
+        lat, lon = random_point(rng)
+        docs.append({"Residency": f"Residency {i}", "location": {"type": "Point", "coordinates": [lon, lat]}})
+    collection.insert_many(docs)
+    collection.create_index([("location", "2dsphere")])
+    return app
+
+
+def run(app, backend):
+    app.config["GEO_BACKEND"] = backend
+    rng = random.Random(2)
+    with app.app_context():
+        invalidate_geo()
+        get_nearest_residencies(*random_point(rng), K)  # warm up (builds the k-d tree)
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            get_nearest_residencies(*random_point(rng), K)
+        elapsed = time.perf_counter() - start
+    print(f"{backend:<8} {elapsed / QUERIES * 1000:>8.3f} ms/query")
+
+
+def bench_geo():
+    app = make_app()
+    run(app, "mongo")
+    run(app, "kdtree")
+
+
+if __name__ == "__main__":
+    print(f"Benchmarking {QUERIES} k={K} queries over {RESIDENCIES} residencies...")
+    bench_geo()
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Compares the development server with the gunicorn production profile on the
+# catalog (GET /residencies) and login (POST /auth/login) routes.
+#
+# 1. Start one of the servers:
+#      python app.py                              (dev server, port 5000)
+#      gunicorn -c gunicorn.conf.py wsgi:app      (production profile, port 5000)
+# 2. Run: BENCH_USERNAME=... BENCH_PASSWORD=... python bench_server.py
+# 3. Repeat with the other server and compare the requests/s and latency lines.
+#
+# Login is dominated by bcrypt, so it shows how well CPU-bound work spreads over
+# worker processes; the catalog route shows I/O-bound throughput.
+#
+# Results: not recorded yet. Both routes need a MongoDB with residencies and a
+# bench user, and the comparison has not been run against one. Add the dev server
+# and gunicorn lines here (with the machine's core count) once it has.
+
+BASE_URL = os.environ.get("BENCH_URL", "http://127.0.0.1:5000")
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 500))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", 32))
+
+
+def catalog():
+    with urllib.request.urlopen(f"{BASE_URL}/residencies") as response:
+        response.read()
+
+
+def login():
+    body = json.dumps({
+        "username": os.environ.get("BENCH_USERNAME", "bench_student"),
+        "password": os.environ.get("BENCH_PASSWORD", "bench_password"),
+    }).encode("utf-8")
+    request = urllib.request.Request(
+        f"{BASE_URL}/auth/login", data=body, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def run(label, call):
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        latencies = sorted(pool.map(timed, range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<8} {REQUESTS / elapsed:>8.1f} req/s   p50 {p50:.1f} ms   p99 {p99:.1f} ms")
+
+
+if __name__ == "__main__":
+    print(f"Benchmarking {BASE_URL} with {REQUESTS} requests, {CONCURRENCY} concurrent...")
+    run("catalog", catalog)
+    run("login", login)
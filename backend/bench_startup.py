@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+# Measures cold start in fresh interpreters: time to import the app module, to
+# build the app, and to serve a first request (/health, no database), and fails
+# when the median regresses past the recorded baseline.
+#
+# Usage:
+#   python bench_startup.py            compare with startup_baseline.json (exit 1 on regression
+#                                      or when there is no baseline)
+#   python bench_startup.py --update   record the current numbers as the new baseline
+# The baseline is in absolute milliseconds: record it with --update on the host
+# that runs the check. The test suite runs the same check only with BENCH_STARTUP=1
+# (tests/test_startup.py).
+
+RUNS = int(os.environ.get("BENCH_RUNS", 7))
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", 0.25))  # allowed slowdown over the baseline
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app(connect=False)
+created = time.perf_counter()
+response = app.test_client().get("/health")
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - start) * 1000,
+}))
+"""
+
+
+def measure():
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=os.path.dirname(BASELINE_PATH),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: sorted(sample[key] for sample in samples)[len(samples) // 2] for key in samples[0]}
+
+
+def bench_startup(update=False):
+    result = measure()
+    for key, value in result.items():
+        print(f"{key:<18} {value:>8.1f} ms")
+
+    if update:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return True
+    if not os.path.exists(BASELINE_PATH):
+        print(f"No baseline at {BASELINE_PATH}; record one with --update")
+        return False
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    ok = True
+    for key, limit in baseline.items():
+        if result.get(key, 0) > limit * (1 + TOLERANCE):
+            print(f"REGRESSION: {key} {result[key]:.1f} ms > baseline {limit:.1f} ms (+{TOLERANCE:.0%})")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    print(f"Measuring cold start over {RUNS} fresh interpreters...")
+    sys.exit(0 if bench_startup(update="--update" in sys.argv[1:]) else 1)
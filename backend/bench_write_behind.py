@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import Flask
+from pymongo import MongoClient
+
+from Models.residency import insert_review
+from Models.write_behind import WriteBehindBuffer
+
+# Compares per-request insert_one with the write-behind buffer.
+# Usage: MONGO_URI=mongodb://localhost:27017 python bench_write_behind.py
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 5000))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", 32))
+
+
+def make_app():
+    app = Flask(__name__)
+    client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    app.db = client["residency_bench"]
+    app.db["reviews"].drop()
+    return app
+
+
+def run(app, label):
+    def one(i):
+        with app.app_context():
+            insert_review({
+                "username": f"student{i % 100}",
+                "residency_id": "bench",
+                "rating": i % 5 + 1,
+                "review_text": "benchmark review",
+                "timestamp": datetime.now(),
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        list(pool.map(one, range(REQUESTS)))
+    buffer = app.extensions.pop("write_behind", None)
+    if buffer:
+        buffer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {REQUESTS / elapsed:>10.0f} inserts/s  ({elapsed:.2f}s)")
+
+
+def bench_write_behind():
+    app = make_app()
+    run(app, "insert_one")
+
+    app = make_app()
+    app.extensions["write_behind"] = WriteBehindBuffer(app)
+    run(app, "group_commit")
+
+
+if __name__ == "__main__":
+    print(f"Benchmarking {REQUESTS} review inserts with {CONCURRENCY} concurrent requests...")
+    bench_write_behind()
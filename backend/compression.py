@@ -0,0 +1,124 @@
+from flask import request, g
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies aren't worth the CPU
+COMPRESS_MIMETYPES = ("application/json", "text/csv")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Catalog payloads are compressed once per ETag, so they can afford the slow settings
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 11
+CACHE_ENTRIES = 128
+
+_cache = OrderedDict()  # (etag, encoding) -> compressed bytes, least recently used first
+_cache_lock = Lock()
+
+
+def catalog_cache(f):
+    """
+    Mark a GET route as cacheable: its response gets an ETag, conditional
+    requests get 304, and compressed bodies are reused per ETag.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.catalog_cache = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _choose_encoding():
+    # Highest client q-value wins; on a tie brotli goes first (smaller output)
+    return request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+
+
+def _compress(data, encoding, cached=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    compressor = zlib.compressobj(CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding):
+    # Flush after every chunk so clients keep receiving data while the export runs
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def _cached_compress(etag, data, encoding):
+    key = (etag, encoding)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    compressed = _compress(data, encoding, cached=True)
+    with _cache_lock:
+        _cache[key] = compressed
+        if len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def compress_response(response):
+    """
+    after_request hook: ETag catalog responses and compress eligible bodies.
+    """
+    if response.status_code < 200 or response.status_code in (204, 304) or "Content-Encoding" in response.headers:
+        return response
+
+    encoding = None
+    if response.mimetype in COMPRESS_MIMETYPES:
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding()
+        if encoding and not response.is_streamed and len(response.get_data()) < COMPRESS_MIN_SIZE:
+            encoding = None
+
+    cacheable = g.get("catalog_cache", False) and response.status_code == 200 and not response.is_streamed
+    if cacheable:
+        response.add_etag()
+        etag, _ = response.get_etag()
+        # Each encoding is its own representation with its own "<etag>-<encoding>" validator
+        validator = f"{etag}-{encoding}" if encoding else etag
+        if request.if_none_match.contains_weak(validator):
+            response.status_code = 304
+            response.set_data(b"")
+            response.set_etag(validator)
+            return response
+        if encoding:
+            response.set_data(_cached_compress(etag, response.get_data(), encoding))
+            response.set_etag(validator)
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(_compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,10 +1,32 @@
-from flask_pymongo import PyMongo
+from pymongo import MongoClient
 
-# MongoDB instance
-mongo = PyMongo()
 
-def init_db(app):
+def connect_db(app):
     """
-    Initializes the MongoDB connection using the Flask app configuration.
+    Open this process's MongoClient and attach the database to the app.
+    The app also calls this lazily on first use of `app.db` (see ResidencyApp).
     """
-    mongo.init_app(app)
+    client = MongoClient(app.config["MONGO_URI"])
+    app.db = client[app.config["MONGO_DBNAME"]]  # Attach the database to the Flask app for use in other parts
+    return app.db
+
+
+def close_db(app):
+    """
+    Close the MongoClient opened by connect_db, if any.
+    """
+    db = getattr(app, "_db", None)
+    if db is not None:
+        db.client.close()
+        app.db = None
+
+
+def ensure_db_indexes(app):
+    """
+    Create every index the application relies on.
+    """
+    from Models.residency import ensure_indexes
+    from ressources.idempotency import ensure_idempotency_indexes
+
+    ensure_indexes(app.db, unique_applications=app.config["UNIQUE_APPLICATIONS"])
+    ensure_idempotency_indexes(app.db)  # TTL index expiring stored Idempotency-Key responses
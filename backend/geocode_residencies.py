@@ -0,0 +1,39 @@
+import sys
+
+from app import create_app
+from Models.geo import load_gazetteer, normalize_place
+from Models.residency import get_all_residencies, update_residency_in_db
+
+# Fills in residency `location` points from a local gazetteer file.
+# Usage: python geocode_residencies.py gazetteer.csv [--force]
+# The gazetteer is a CSV with `name,latitude,longitude` columns; residencies are
+# matched on their "Residency" name.
+
+
+def geocode_residencies(path, force=False):
+    places = load_gazetteer(path)
+    app = create_app()
+    with app.app_context():
+        located, missing = 0, []
+        for residency in get_all_residencies():
+            if "location" in residency and not force:
+                continue
+            coordinates = places.get(normalize_place(residency.get("Residency", "")))
+            if not coordinates:
+                missing.append(residency.get("Residency", residency["_id"]))
+                continue
+            lat, lon = coordinates
+            # GeoJSON points are [longitude, latitude]
+            update_residency_in_db(residency["_id"], {"location": {"type": "Point", "coordinates": [lon, lat]}})
+            located += 1
+
+    print(f"Located {located} residencies.")
+    for name in missing:
+        print("Not in gazetteer:", name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python geocode_residencies.py <gazetteer.csv> [--force]")
+        sys.exit(1)
+    geocode_residencies(sys.argv[1], force="--force" in sys.argv[2:])
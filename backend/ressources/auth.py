@@ -102,24 +102,39 @@ def login():
         return jsonify({"message": f"Error: {e}"}), 500
 
 
+# Environ key carrying the user already authenticated by /batch to its sub-requests.
+# WSGI environ keys without the HTTP_ prefix can't be set by clients.
+BATCH_USER_ENVIRON_KEY = "residency.batch_user"
+
+
+def authenticate(token):
+    """
+    Decode a JWT. Returns (user, None) or (None, error response).
+    """
+    if not token:
+        return None, (jsonify({"message": "Token is missing"}), 403)
+
+    if token in LOGGED_OUT_TOKENS:  # Check if the token has been logged out
+        return None, (jsonify({"message": "Token is invalid"}), 403)
+
+    try:
+        return jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"]), None
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({"message": "Token has expired"}), 403)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({"message": "Invalid token"}), 403)
+
+
 # Decorator to enforce JWT-based authentication
 def token_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"message": "Token is missing"}), 403
-
-        if token in LOGGED_OUT_TOKENS:  # Check if the token has been logged out
-            return jsonify({"message": "Token is invalid"}), 403
-
-        try:
-            data = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-            current_app.user = data  # Store user information in app context
-        except jwt.ExpiredSignatureError:
-            return jsonify({"message": "Token has expired"}), 403
-        except jwt.InvalidTokenError:
-            return jsonify({"message": "Invalid token"}), 403
+        data = request.environ.get(BATCH_USER_ENVIRON_KEY)
+        if data is None:
+            data, error = authenticate(request.headers.get("Authorization"))
+            if error:
+                return error
+        current_app.user = data  # Store user information for this request (see create_app)
 
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,142 @@
+from flask import Blueprint, jsonify, request, current_app
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from urllib.parse import urlsplit
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+import os
+from ressources.auth import authenticate, BATCH_USER_ENVIRON_KEY
+from Models.residency import prefetch, PREFETCH_ENVIRON_KEY
+
+BatchBlueprint = Blueprint("batch", __name__)
+
+MAX_SUB_REQUESTS = 50
+DEFAULT_BATCH_WORKERS = 8
+
+# Endpoint -> (prefetch kind, URL argument, admin only)
+PREFETCH_ENDPOINTS = {
+    "residency.get_residency": ("residency", "residency_id", False),
+    "residency.get_block": ("block", "block_id", True),
+    "residency.get_room": ("room", "room_id", True),
+    "residency.get_blocks": ("blocks_of_residency", "residency_id", True),
+    "residency.get_rooms": ("rooms_of_block", "block_id", True),
+}
+
+_pool_lock = Lock()
+_pool = None
+_pool_pid = None
+
+
+def _get_pool():
+    # One bounded pool per worker process (threads don't survive fork)
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(
+                current_app.config.get("BATCH_WORKERS", DEFAULT_BATCH_WORKERS), thread_name_prefix="batch"
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _collect_lookups(sub_requests, user):
+    """
+    Group the ID lookups of GET sub-requests by kind so each kind is one $in query.
+    """
+    adapter = current_app.url_map.bind("localhost")
+    is_admin = user is not None and user.get("role") == "admin"
+    lookups = {}
+    for sub in sub_requests:
+        url = urlsplit(sub["path"])
+        if url.query:  # e.g. ?since= takes a different code path
+            continue
+        try:
+            endpoint, args = adapter.match(url.path, method="GET")
+        except HTTPException:
+            continue
+        if endpoint not in PREFETCH_ENDPOINTS:
+            continue
+        kind, arg, admin_only = PREFETCH_ENDPOINTS[endpoint]
+        if admin_only and not is_admin:
+            continue
+        lookups.setdefault(kind, set()).add(args[arg])
+    return lookups
+
+
+def _dispatch(app, sub, environ, authorization):
+    """
+    Run one sub-request through the normal routing, decorators and handlers.
+    """
+    headers = Headers(sub.get("headers") or {})  # case-insensitive, like real request headers
+    headers.remove("Accept-Encoding")  # sub-responses are embedded as JSON, not compressed
+    if authorization:
+        headers["Authorization"] = authorization
+    try:
+        with app.test_request_context(
+            sub["path"], method=sub["method"], json=sub.get("body"), headers=headers, environ_overrides=environ
+        ):
+            response = app.make_response(app.full_dispatch_request())
+            body = response.get_json(silent=True)
+            if body is None:
+                body = response.get_data(as_text=True)
+            return {"id": sub["id"], "status": response.status_code, "body": body}
+    except Exception as e:
+        app.logger.error(f"Error in batch sub-request {sub['method']} {sub['path']}: {e}")
+        return {"id": sub["id"], "status": 500, "body": {"message": "Internal server error"}}
+
+
+@BatchBlueprint.route("/batch", methods=["POST"])
+def batch():
+    """
+    Run several API calls in one request: {"requests": [{"id", "method", "path", "body", "headers"}]}.
+    The token is verified once; consecutive GETs run concurrently, writes
+    (when BATCH_ALLOW_WRITES is set) run one at a time in the order given.
+    """
+    data = request.json
+    sub_requests = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"message": "'requests' must be a non-empty list"}), 400
+    if len(sub_requests) > MAX_SUB_REQUESTS:
+        return jsonify({"message": f"At most {MAX_SUB_REQUESTS} sub-requests per batch"}), 400
+
+    user = None
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        user, error = authenticate(authorization)
+        if error:
+            return error
+
+    allow_writes = current_app.config.get("BATCH_ALLOW_WRITES", False)
+    parsed = []
+    for index, sub in enumerate(sub_requests):
+        if not isinstance(sub, dict) or not isinstance(sub.get("path"), str) or not sub["path"].startswith("/"):
+            return jsonify({"message": f"Sub-request {index} needs an absolute 'path'"}), 400
+        method = str(sub.get("method", "GET")).upper()
+        if method != "GET" and not allow_writes:
+            return jsonify({"message": f"Sub-request {index}: only GET is allowed in a batch"}), 400
+        if urlsplit(sub["path"]).path.rstrip("/") == "/batch":
+            return jsonify({"message": "Batches can't be nested"}), 400
+        parsed.append(dict(sub, id=sub.get("id", index), method=method))
+
+    app = current_app._get_current_object()
+    base_environ = {}
+    if user is not None:
+        base_environ[BATCH_USER_ENVIRON_KEY] = user
+
+    results = []
+    start = 0
+    while start < len(parsed):
+        if parsed[start]["method"] != "GET":
+            results.append(_dispatch(app, parsed[start], base_environ, authorization))
+            start += 1
+            continue
+        # A run of GETs: prefetch their ID lookups together, then fan out on the pool
+        end = start
+        while end < len(parsed) and parsed[end]["method"] == "GET":
+            end += 1
+        segment = parsed[start:end]
+        environ = dict(base_environ, **{PREFETCH_ENVIRON_KEY: prefetch(_collect_lookups(segment, user))})
+        results.extend(_get_pool().map(lambda sub: _dispatch(app, sub, environ, authorization), segment))
+        start = end
+
+    return jsonify({"responses": results}), 200
@@ -0,0 +1,128 @@
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from bson import ObjectId
+import csv
+import io
+import os
+import tempfile
+from ressources.auth import token_required
+from ressources.residency import request_filters
+from Models.residency import APPLICATION_FILTERS, REVIEW_FILTERS
+from Models.export import (
+    APPLICATION_COLUMNS,
+    REVIEW_COLUMNS,
+    OCCUPANCY_COLUMNS,
+    iter_application_rows,
+    iter_review_rows,
+    iter_occupancy_rows,
+)
+
+ExportBlueprint = Blueprint("export", __name__)
+
+CSV_CHUNK_ROWS = 500
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def _stream_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _load_xlsxwriter():
+    # Imported on first XLSX export only; it's optional and slow to import
+    try:
+        import xlsxwriter
+    except ImportError:
+        return None
+    return xlsxwriter
+
+
+def _stream_xlsx(xlsxwriter, columns, rows):
+    # constant_memory flushes each row to disk as it's written; the finished
+    # workbook is then streamed back from the temporary file
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd hh:mm",
+            "remove_timezone": True,
+        })
+        sheet = workbook.add_worksheet()
+        sheet.write_row(0, 0, columns)
+        for index, row in enumerate(rows, 1):
+            sheet.write_row(index, 0, [value if value is not None else "" for value in row])
+        workbook.close()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(FILE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def _export(name, columns, rows):
+    file_format = request.args.get("format", "csv")
+    if file_format == "xlsx":
+        xlsxwriter = _load_xlsxwriter()
+        if xlsxwriter is None:
+            return jsonify({"message": "XLSX export requires the xlsxwriter package"}), 501
+        body, mimetype = _stream_xlsx(xlsxwriter, columns, rows), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    elif file_format == "csv":
+        body, mimetype = _stream_csv(columns, rows), "text/csv"
+    else:
+        return jsonify({"message": "format must be 'csv' or 'xlsx'"}), 400
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={name}.{file_format}"},
+    )
+
+
+### Export Endpoints (admin only)
+
+@ExportBlueprint.route("/applications", methods=["GET"])
+@token_required
+def export_applications():
+    """Stream applications as CSV or XLSX, filtered by `?status=&residency_id=`."""
+    if current_app.user["role"] != "admin":
+        return jsonify({"message": "Permission denied"}), 403
+
+    rows = iter_application_rows(request_filters(APPLICATION_FILTERS))
+    return _export("applications", APPLICATION_COLUMNS, rows)
+
+
+@ExportBlueprint.route("/reviews", methods=["GET"])
+@token_required
+def export_reviews():
+    """Stream reviews as CSV or XLSX, filtered by `?residency_id=`."""
+    if current_app.user["role"] != "admin":
+        return jsonify({"message": "Permission denied"}), 403
+
+    rows = iter_review_rows(request_filters(REVIEW_FILTERS))
+    return _export("reviews", REVIEW_COLUMNS, rows)
+
+
+@ExportBlueprint.route("/occupancy", methods=["GET"])
+@token_required
+def export_occupancy():
+    """Stream room occupancy as CSV or XLSX, optionally for one `?residency_id=`."""
+    if current_app.user["role"] != "admin":
+        return jsonify({"message": "Permission denied"}), 403
+
+    residency_id = request.args.get("residency_id")
+    if residency_id and not ObjectId.is_valid(residency_id):
+        return jsonify({"message": "Invalid residency_id"}), 400
+
+    rows = iter_occupancy_rows(residency_id)
+    return _export("occupancy", OCCUPANCY_COLUMNS, rows)
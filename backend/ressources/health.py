@@ -0,0 +1,9 @@
+from flask import Blueprint, jsonify
+
+HealthBlueprint = Blueprint("health", __name__)
+
+
+@HealthBlueprint.route("/health", methods=["GET"])
+def health():
+    """Liveness probe; doesn't touch the database."""
+    return jsonify({"status": "ok"}), 200
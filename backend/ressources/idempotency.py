@@ -0,0 +1,78 @@
+from flask import request, jsonify, current_app, make_response
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from pymongo.errors import DuplicateKeyError
+import hashlib
+import uuid
+
+IDEMPOTENCY_TTL = 24 * 60 * 60  # seconds a stored response can be replayed
+IDEMPOTENCY_LEASE = 60  # seconds before an unfinished claim can be taken over (longer than the worker timeout)
+
+
+def ensure_idempotency_indexes(db, ttl=IDEMPOTENCY_TTL):
+    """
+    Expire stored responses after `ttl` seconds.
+    """
+    db["idempotency_keys"].create_index("created_at", expireAfterSeconds=ttl)
+
+
+# Decorator to replay the stored response for a repeated Idempotency-Key
+# Must be applied below @token_required so the key is scoped to the caller.
+def idempotent(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return f(*args, **kwargs)
+
+        collection = current_app.db["idempotency_keys"]
+        record_id = f"{current_app.user['username']}:{request.method}:{request.path}:{key}"
+        body_hash = hashlib.sha256(request.get_data()).hexdigest()
+        claim = uuid.uuid4().hex  # identifies this request's claim, so a stale holder can't touch a newer one
+        now = datetime.now(timezone.utc)
+        try:
+            # Claim the key first so concurrent retries can't both run the handler
+            collection.insert_one({
+                "_id": record_id,
+                "state": "in_progress",
+                "body_hash": body_hash,
+                "claim": claim,
+                "created_at": now,
+                "locked_at": now,
+            })
+        except DuplicateKeyError:
+            record = collection.find_one({"_id": record_id})
+            if record is not None and record.get("body_hash") != body_hash:
+                return jsonify({"message": "This Idempotency-Key was already used with a different request body"}), 422
+            if record is not None and record["state"] == "done":
+                response = make_response(jsonify(record["body"]), record["status_code"])
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            # Take over a claim whose holder died before finishing (its lease has run out)
+            record = collection.find_one_and_update(
+                {
+                    "_id": record_id,
+                    "state": "in_progress",
+                    "locked_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LEASE)},
+                },
+                {"$set": {"claim": claim, "locked_at": now}},
+            )
+            if record is None:
+                return jsonify({"message": "A request with this Idempotency-Key is still in progress"}), 409
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            collection.delete_one({"_id": record_id, "claim": claim})
+            raise
+
+        if response.status_code >= 400:
+            # Errors aren't stored: the client can fix the request or retry with the same key
+            collection.delete_one({"_id": record_id, "claim": claim})
+        else:
+            collection.update_one(
+                {"_id": record_id, "claim": claim},
+                {"$set": {"state": "done", "status_code": response.status_code, "body": response.get_json()}},
+            )
+        return response
+    return decorated_function
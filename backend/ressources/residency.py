@@ -1,47 +1,179 @@
 from bson import ObjectId
 from flask import Blueprint, jsonify, request, current_app, abort
 from datetime import datetime
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import Blueprint, jsonify, request, abort, current_app
+from marshmallow import ValidationError
+from pymongo.errors import DuplicateKeyError
 from ressources.auth import token_required
+from ressources.idempotency import idempotent
+from compression import catalog_cache
+from schemas import (
+    residency_schema,
+    residency_update_schema,
+    block_schema,
+    block_update_schema,
+    room_schema,
+    room_update_schema,
+    application_schema,
+    review_schema,
+)
 from Models.residency import (
     get_all_residencies,
     get_residency_by_id,
+    get_residency_changes,
     insert_residency,
     update_residency_in_db,
     delete_residency_from_db,
     get_blocks_by_residency,
+    get_block_changes,
     get_block_by_id,
     insert_block,
     update_block_by_id,
     delete_block_by_id,
     get_rooms_by_block,
+    get_room_changes,
     get_room_by_id,
     insert_room,
     update_room_by_id,
     delete_room_by_id,
     get_all_applications,
+    get_applications_by_user,
+    get_application_changes,
     get_application_by_id,
     insert_application,
     delete_application,
     get_all_reviews,
+    get_reviews_by_user,
+    get_review_changes,
     get_review_by_id,
     insert_review,
     delete_review,
+    APPLICATION_FILTERS,
+    REVIEW_FILTERS,
+    get_sync_version,
 )
+from Models.stats import get_dashboard_stats
+from Models.single_flight import get_single_flight_stats
+from Models.geo import get_nearest_residencies, get_student_university, lookup_place
 
 ResidencyBlueprint = Blueprint("residency", __name__)
 
+SYNC_VERSION_HEADER = "X-Sync-Version"
+
+
+def _since_arg():
+    """
+    Read the optional `?since=<version>` delta-sync parameter.
+    """
+    since = request.args.get("since")
+    if since is None:
+        return None
+    try:
+        return int(since)
+    except ValueError:
+        abort(400, description="'since' must be an integer version")
+
+
+def request_filters(names):
+    """
+    Collect the non-empty `?name=value` list filters among `names` into a Mongo query.
+    """
+    return {name: request.args[name] for name in names if request.args.get(name)}
+
+
+def _full_listing(collection_name, fetch):
+    """
+    Respond with a full listing plus the X-Sync-Version to resume from with `?since=`.
+    The version is read first, so writes it doesn't cover show up in the next delta.
+    """
+    version = get_sync_version(collection_name)
+    response = jsonify(fetch())
+    if version is not None:
+        response.headers[SYNC_VERSION_HEADER] = str(version)
+    return response, 200
+
 ### Residency Endpoints
 
 @ResidencyBlueprint.route("/residencies", methods=["GET"])
+@catalog_cache
 def get_residencies():
-    """Fetch all residencies (open to everyone)."""
-    residencies = get_all_residencies()
-    return jsonify(residencies), 200
+    """Fetch all residencies (open to everyone), or only the changes after `?since=`."""
+    since = _since_arg()
+    if since is not None:
+        return jsonify(get_residency_changes(since)), 200
+    return _full_listing("residencies", get_all_residencies)
+
+
+def _validate(schema):
+    """
+    Load the JSON body through `schema`. Returns (data, None) or (None, error response).
+    """
+    try:
+        data = schema.load(request.get_json(silent=True))
+    except ValidationError as err:
+        return None, (jsonify({"message": "Invalid input", "errors": err.messages}), 400)
+    if not data:
+        return None, (jsonify({"message": "Invalid input"}), 400)
+    return data, None
+
+
+def _page_args():
+    """
+    Read `?page=&per_page=` (per_page capped at 100).
+    """
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = max(1, min(request.args.get("per_page", 20, type=int), 100))
+    return page, per_page
+
+
+def _k_arg():
+    k = request.args.get("k", 5, type=int)
+    return max(1, min(k, 50))
+
+
+@ResidencyBlueprint.route("/residencies/nearby", methods=["GET"])
+def get_nearby_residencies():
+    """Fetch the k residencies closest to `?lat=&lon=` (open to everyone)."""
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None:
+        abort(400, description="'lat' and 'lon' are required")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        abort(400, description="'lat' must be within [-90, 90] and 'lon' within [-180, 180]")
+    try:
+        return jsonify(get_nearest_residencies(lat, lon, _k_arg())), 200
+    except Exception as e:
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
+@ResidencyBlueprint.route("/residencies/near-my-university", methods=["GET"])
+@token_required
+def get_residencies_near_university():
+    """Fetch the k residencies closest to the student's university (student only)."""
+    if current_app.user["role"] != "student":
+        return jsonify({"message": "Permission denied"}), 403
+
+    try:
+        university = get_student_university(current_app.user["username"])
+    except Exception as e:
+        return jsonify({"message": f"Error: {e}"}), 500
+    if not university:
+        return jsonify({"message": "No university on record"}), 404
+    try:
+        coordinates = lookup_place(university)
+    except Exception as e:
+        return jsonify({"message": f"Error: {e}"}), 503
+    if not coordinates:
+        return jsonify({"message": f"University '{university}' is not in the gazetteer"}), 404
+
+    lat, lon = coordinates
+    try:
+        return jsonify(get_nearest_residencies(lat, lon, _k_arg())), 200
+    except Exception as e:
+        return jsonify({"message": f"Error: {e}"}), 500
 
 
 @ResidencyBlueprint.route("/residencies/<string:residency_id>", methods=["GET"])
+@catalog_cache
 def get_residency(residency_id):
     """Fetch a specific residency by its ID (open to everyone)."""
     residency = get_residency_by_id(residency_id)
@@ -57,9 +189,9 @@ def create_residency():
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data:
-        abort(400, description="Invalid input")
+    data, error = _validate(residency_schema)
+    if error:
+        return error
     residency_id = insert_residency(data)
     return jsonify({"message": "Residency created", "residency_id": residency_id}), 201
 
@@ -71,7 +203,9 @@ def update_residency(residency_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
+    data, error = _validate(residency_update_schema)
+    if error:
+        return error
     updated = update_residency_in_db(residency_id, data)
     if not updated:
         abort(404, description="Residency not found or update failed")
@@ -91,6 +225,35 @@ def delete_residency(residency_id):
     return jsonify({"message": "Residency deleted successfully"}), 200
 
 
+### Dashboard Endpoints
+
+@ResidencyBlueprint.route("/stats", methods=["GET"])
+@token_required
+def get_stats():
+    """
+    Administrator: Fetch application, occupancy and review counts for the dashboard.
+    """
+    if current_app.user["role"] != "admin":
+        return jsonify({"message": "Permission denied"}), 403
+
+    try:
+        return jsonify(get_dashboard_stats()), 200
+    except Exception as e:
+        return jsonify({"message": f"Error: {e}"}), 500
+
+
+@ResidencyBlueprint.route("/stats/single-flight", methods=["GET"])
+@token_required
+def get_coalescing_stats():
+    """
+    Administrator: Fetch per-getter counts of DB reads collapsed by request coalescing (this worker only).
+    """
+    if current_app.user["role"] != "admin":
+        return jsonify({"message": "Permission denied"}), 403
+
+    return jsonify(get_single_flight_stats()), 200
+
+
 ### Block Endpoints
 
 @ResidencyBlueprint.route("/<string:residency_id>/blocks", methods=["GET"])
@@ -102,9 +265,11 @@ def get_blocks(residency_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
+    since = _since_arg()
     try:
-        blocks = get_blocks_by_residency(residency_id)
-        return jsonify(blocks), 200
+        if since is not None:
+            return jsonify(get_block_changes(residency_id, since)), 200
+        return _full_listing("blocks", lambda: get_blocks_by_residency(residency_id))
     except Exception as e:
         return jsonify({"message": f"Error: {e}"}), 500
 
@@ -136,9 +301,9 @@ def post_block(residency_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data or not all(key in data for key in ("block_name", "number_of_floors", "total_rooms")):
-        return jsonify({"message": "Missing required fields"}), 400
+    data, error = _validate(block_schema)
+    if error:
+        return error
 
     # Add residency_id to the block data
     data["residency_id"] = ObjectId(residency_id)
@@ -160,9 +325,9 @@ def update_block(block_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data:
-        return jsonify({"message": "Invalid input"}), 400
+    data, error = _validate(block_update_schema)
+    if error:
+        return error
 
     # Update block using block_id
     updated = update_block_by_id(block_id, data)
@@ -200,9 +365,11 @@ def get_rooms(block_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
+    since = _since_arg()
     try:
-        rooms = get_rooms_by_block(block_id)
-        return jsonify(rooms), 200
+        if since is not None:
+            return jsonify(get_room_changes(block_id, since)), 200
+        return _full_listing("rooms", lambda: get_rooms_by_block(block_id))
     except Exception as e:
         return jsonify({"message": f"Error: {e}"}), 500
 
@@ -232,9 +399,9 @@ def post_room(block_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data or not all(key in data for key in ("room_number", "floor", "capacity", "is_available")):
-        return jsonify({"message": "Missing required fields"}), 400
+    data, error = _validate(room_schema)
+    if error:
+        return error
 
     # Add block_id to the room data
     data["block_id"] = ObjectId(block_id)
@@ -256,9 +423,9 @@ def update_room(room_id):
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data:
-        return jsonify({"message": "Invalid input"}), 400
+    data, error = _validate(room_update_schema)
+    if error:
+        return error
 
     # Update room using room_id
     updated = update_room_by_id(room_id, data)
@@ -290,12 +457,16 @@ def delete_room(room_id):
 @ResidencyBlueprint.route("/applications", methods=["GET"])
 @token_required
 def get_applications():
-    """Fetch all applications (admin only)."""
+    """Fetch all applications (filtered by `?status=&residency_id=`), or only the changes after `?since=` (admin only)."""
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    applications = get_all_applications()
-    return jsonify(applications), 200
+    since = _since_arg()
+    if since is not None:
+        return jsonify(get_application_changes(since)), 200
+
+    filters = request_filters(APPLICATION_FILTERS)
+    return _full_listing("applications", lambda: get_all_applications(filters))
 
 
 @ResidencyBlueprint.route("/applications/<string:application_id>", methods=["GET"])
@@ -316,24 +487,29 @@ def get_application(application_id):
 
 @ResidencyBlueprint.route("/applications", methods=["POST"])
 @token_required
+@idempotent
 def post_application():
     """Submit a new application (student only)."""
     if current_app.user["role"] != "student":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data or not all(key in data for key in ("residency_id", "preferred_roommate", "disease_status")):
-        return jsonify({"message": "Missing required fields"}), 400
+    data, error = _validate(application_schema)
+    if error:
+        return error
 
     application_data = {
         "username": current_app.user["username"],
         "residency_id": data["residency_id"],
-        "preferred_roommate": data.get("preferred_roommate", ""),
-        "disease_status": data.get("disease_status", ""),
-        "status": "pending"
+        "preferred_roommate": data["preferred_roommate"],
+        "disease_status": data["disease_status"],
+        "status": "pending",
+        "created_at": datetime.now()
     }
 
-    application_id = insert_application(application_data)
+    try:
+        application_id = insert_application(application_data)
+    except DuplicateKeyError:
+        return jsonify({"message": "You have already applied to this residency"}), 409
     return jsonify({"message": "Application submitted successfully", "application_id": application_id}), 201
 
 
@@ -346,22 +522,38 @@ def delete_application_route(application_id):
         return jsonify({"message": "Permission denied"}), 403
 
     username = current_app.user["username"]
-    deleted = delete_application(application_id)
+    deleted = delete_application(application_id, username=username)
     if not deleted:
         abort(404, description="Application not found")
     return jsonify({"message": "Application deleted successfully"}), 200
 
+
+@ResidencyBlueprint.route("/my/applications", methods=["GET"])
+@token_required
+def get_my_applications():
+    """Fetch the logged-in student's applications, newest first (student only)."""
+    if current_app.user["role"] != "student":
+        return jsonify({"message": "Permission denied"}), 403
+
+    page, per_page = _page_args()
+    applications = get_applications_by_user(current_app.user["username"], page, per_page)
+    return jsonify({"items": applications, "page": page, "per_page": per_page}), 200
+
 ### Admin Review Endpoints
 
 @ResidencyBlueprint.route("/reviews", methods=["GET"])
 @token_required
 def get_reviews():
-    """Fetch all reviews (admin only)."""
+    """Fetch all reviews (filtered by `?residency_id=`), or only the changes after `?since=` (admin only)."""
     if current_app.user["role"] != "admin":
         return jsonify({"message": "Permission denied"}), 403
 
-    reviews = get_all_reviews()
-    return jsonify(reviews), 200
+    since = _since_arg()
+    if since is not None:
+        return jsonify(get_review_changes(since)), 200
+
+    filters = request_filters(REVIEW_FILTERS)
+    return _full_listing("reviews", lambda: get_all_reviews(filters))
 
 
 @ResidencyBlueprint.route("/reviews/<string:review_id>", methods=["GET"])
@@ -383,14 +575,15 @@ def get_review(review_id):
 # student review endpoints
 @ResidencyBlueprint.route("/reviews", methods=["POST"])
 @token_required
+@idempotent
 def post_review():
     """Submit a new review (student only)."""
     if current_app.user["role"] != "student":
         return jsonify({"message": "Permission denied"}), 403
 
-    data = request.json
-    if not data or not all(key in data for key in ("residency_id", "rating", "review_text")):
-        return jsonify({"message": "Missing required fields"}), 400
+    data, error = _validate(review_schema)
+    if error:
+        return error
 
     review_data = {
         "username": current_app.user["username"],
@@ -411,7 +604,19 @@ def delete_review_route(review_id):
     if current_app.user["role"] != "student":
         return jsonify({"message": "Permission denied"}), 403
 
-    deleted = delete_review(review_id)
+    deleted = delete_review(review_id, username=current_app.user["username"])
     if not deleted:
         abort(404, description="Review not found")
-    return jsonify({"message": "Review deleted successfully"}), 200
\ No newline at end of file
+    return jsonify({"message": "Review deleted successfully"}), 200
+
+
+@ResidencyBlueprint.route("/my/reviews", methods=["GET"])
+@token_required
+def get_my_reviews():
+    """Fetch the logged-in student's reviews, newest first (student only)."""
+    if current_app.user["role"] != "student":
+        return jsonify({"message": "Permission denied"}), 403
+
+    page, per_page = _page_args()
+    reviews = get_reviews_by_user(current_app.user["username"], page, per_page)
+    return jsonify({"items": reviews, "page": page, "per_page": per_page}), 200
\ No newline at end of file
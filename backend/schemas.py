@@ -1,10 +1,94 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+
+# Request schemas for every write route. Unknown fields are rejected
+# (marshmallow's default RAISE), types are coerced, and strings are bounded so
+# stored documents stay small. Each schema's fields also define the Mongo
+# projection used when reading the collection back (see mongo_projection).
+
+
+class NumericStr(fields.Str):
+    """
+    String field that also accepts a number and stores it as text, for values
+    like phone and room numbers that the CSV data and edit forms send as numbers.
+    """
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(int(value)) if float(value).is_integer() else str(value)
+        return super()._deserialize(value, attr, data, **kwargs)
+
+
+class PointSchema(Schema):
+    type = fields.Str(required=True, validate=validate.Equal("Point"))
+    coordinates = fields.List(fields.Float(), required=True, validate=validate.Length(equal=2))  # [lon, lat]
+
 
 class ResidencySchema(Schema):
     id = fields.Str(dump_only=True)  # MongoDB ObjectID
-    Residency_Type = fields.Str(required=True)
-    Residency = fields.Str(required=True)
-    city = fields.Str(required=True)
-    Telephone = fields.Int()
-    Adress = fields.Str()
-    Available_transportation = fields.Str()
+    Residency_Type = fields.Str(required=True, data_key="Residency-Type", attribute="Residency-Type", validate=validate.Length(max=100))
+    Residency = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+    City = fields.Str(required=True, validate=validate.Length(max=100))
+    Telephone = NumericStr(validate=validate.Length(max=30))
+    Address = fields.Str(validate=validate.Length(max=500))
+    Available_transportation = fields.Str(validate=validate.Length(max=500))
+    location = fields.Nested(PointSchema)
+
+
+class BlockSchema(Schema):
+    residency_id = fields.Str(dump_only=True)  # Taken from the URL
+    block_name = fields.Str(required=True, validate=validate.Length(min=1, max=100))
+    number_of_floors = fields.Int(required=True, validate=validate.Range(min=0, max=200))
+    total_rooms = fields.Int(required=True, validate=validate.Range(min=0, max=10000))
+
+
+class RoomSchema(Schema):
+    block_id = fields.Str(dump_only=True)  # Taken from the URL
+    room_number = NumericStr(required=True, validate=validate.Length(min=1, max=20))
+    floor = fields.Int(required=True, validate=validate.Range(min=0, max=200))
+    capacity = fields.Int(required=True, validate=validate.Range(min=1, max=50))
+    is_available = fields.Bool(required=True)
+
+
+class ApplicationSchema(Schema):
+    application_id = fields.Str(dump_only=True)
+    username = fields.Str(dump_only=True)
+    status = fields.Str(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    residency_id = fields.Str(required=True, validate=validate.Length(min=1, max=64))
+    preferred_roommate = fields.Str(required=True, validate=validate.Length(max=100))
+    disease_status = fields.Str(required=True, validate=validate.Length(max=500))
+
+
+class ReviewSchema(Schema):
+    review_id = fields.Str(dump_only=True)
+    username = fields.Str(dump_only=True)
+    timestamp = fields.DateTime(dump_only=True)
+    residency_id = fields.Str(required=True, validate=validate.Length(min=1, max=64))
+    rating = fields.Int(required=True, validate=validate.Range(min=1, max=5))
+    review_text = fields.Str(required=True, validate=validate.Length(max=2000))
+
+
+def mongo_projection(schema, *extra):
+    """
+    Project a document down to the schema's stored keys plus `extra` (and _id).
+    """
+    keys = [field.data_key or name for name, field in schema.fields.items()]
+    return {key: 1 for key in (*keys, *extra)}
+
+
+# Compiled once at import; schema instances are reusable across requests
+residency_schema = ResidencySchema()
+residency_update_schema = ResidencySchema(partial=True)
+block_schema = BlockSchema()
+block_update_schema = BlockSchema(partial=True)
+room_schema = RoomSchema()
+room_update_schema = RoomSchema(partial=True)
+application_schema = ApplicationSchema()
+review_schema = ReviewSchema()
+
+TRACKING_FIELDS = ("version", "updated_at")  # written by the delta-sync stamps
+RESIDENCY_PROJECTION = mongo_projection(residency_schema, *TRACKING_FIELDS)
+BLOCK_PROJECTION = mongo_projection(block_schema, *TRACKING_FIELDS)
+ROOM_PROJECTION = mongo_projection(room_schema, *TRACKING_FIELDS)
+APPLICATION_PROJECTION = mongo_projection(application_schema, *TRACKING_FIELDS)
+REVIEW_PROJECTION = mongo_projection(review_schema, *TRACKING_FIELDS)
@@ -0,0 +1,17 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def wait_for():
+    """
+    Poll `condition` until it holds, failing the test after `timeout` seconds.
+    """
+    def wait(condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("timed out waiting for condition")
+            time.sleep(0.001)
+    return wait
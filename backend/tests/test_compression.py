@@ -0,0 +1,111 @@
+import gzip
+import json
+
+import pytest
+
+import compression
+from app import create_app
+
+
+class FakeCollection:
+    def __init__(self, docs=(), one=None):
+        self.docs = list(docs)
+        self.one = one
+
+    def find(self, *args, **kwargs):
+        return [dict(doc) for doc in self.docs]
+
+    def find_one(self, *args, **kwargs):
+        return self.one
+
+
+def _residencies(count):
+    return [
+        {"_id": f"r{n}", "Residency": f"Residency {n}", "City": "Tunis", "Address": "Avenue Habib Bourguiba " * 3}
+        for n in range(count)
+    ]
+
+
+@pytest.fixture
+def make_client():
+    def make(residency_count):
+        app = create_app(connect=False)
+        app.db = {"counters": FakeCollection(one={"seq": 0}), "residencies": FakeCollection(_residencies(residency_count))}
+        return app.test_client()
+    return make
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(50)  # well over COMPRESS_MIN_SIZE once serialized
+
+
+def _get(client, **headers):
+    return client.get("/residencies", headers=headers)
+
+
+def test_client_preference_beats_server_preference(client):
+    response = _get(client, **{"Accept-Encoding": "gzip;q=1, br;q=0.1"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.get_data()))) == 50
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_wins_a_tie(client):
+    response = _get(client, **{"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert len(json.loads(compression.brotli.decompress(response.get_data()))) == 50
+
+
+def test_refused_encodings_are_not_used(client):
+    response = _get(client, **{"Accept-Encoding": "br;q=0, gzip;q=0"})
+
+    assert "Content-Encoding" not in response.headers
+    assert len(response.get_json()) == 50
+
+
+def test_uncompressed_without_accept_encoding(client):
+    response = _get(client)
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.get_json()) == 50
+
+
+def test_small_bodies_are_not_compressed(make_client):
+    response = _get(make_client(1), **{"Accept-Encoding": "gzip"})
+
+    assert len(response.get_data()) < compression.COMPRESS_MIN_SIZE
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gzip"')
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = _get(client).headers["ETag"]
+    gzipped = _get(client, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    assert gzipped == plain[:-1] + '-gzip"'
+
+
+def test_not_modified_carries_the_encoded_etag_and_vary(client):
+    etag = _get(client, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    response = _get(client, **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.get_data() == b""
+
+
+def test_validator_of_another_encoding_does_not_match(client):
+    etag = _get(client, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    response = _get(client, **{"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] != etag
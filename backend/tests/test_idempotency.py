@@ -0,0 +1,219 @@
+from datetime import datetime, timedelta, timezone
+import hashlib
+
+import pytest
+from flask import current_app, jsonify, request
+from pymongo.errors import DuplicateKeyError
+
+from app import ResidencyApp
+from ressources.idempotency import idempotent, IDEMPOTENCY_LEASE
+
+
+def _matches(doc, query):
+    for key, expected in query.items():
+        if isinstance(expected, dict) and "$lt" in expected:
+            if key not in doc or not doc[key] < expected["$lt"]:
+                return False
+        elif doc.get(key) != expected:
+            return False
+    return True
+
+
+class FakeCollection:
+    """
+    Just enough of a pymongo collection for the idempotency records.
+    """
+
+    def __init__(self):
+        self.docs = {}
+
+    def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("E11000 duplicate key", 11000)
+        self.docs[doc["_id"]] = dict(doc)
+
+    def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    def find_one_and_update(self, query, update):
+        before = self.find_one(query)
+        if before is not None:
+            self.docs[before["_id"]].update(update["$set"])
+        return before
+
+    def update_one(self, query, update):
+        doc = self.find_one(query)
+        if doc is not None:
+            self.docs[doc["_id"]].update(update["$set"])
+
+    def delete_one(self, query):
+        doc = self.find_one(query)
+        if doc is not None:
+            del self.docs[doc["_id"]]
+
+
+@pytest.fixture
+def keys():
+    return FakeCollection()
+
+
+@pytest.fixture
+def app(keys):
+    app = ResidencyApp(__name__)
+    app.db = {"idempotency_keys": keys}
+    app.calls = []
+    app.reply = (201, None)  # status code and optional side effect run by the handler
+
+    @app.route("/applications", methods=["POST"])
+    def create():
+        current_app.user = {"username": request.headers.get("X-User", "student")}  # stands in for token_required
+        return create_application()
+
+    @idempotent
+    def create_application():
+        status_code, side_effect = app.reply
+        app.calls.append(request.get_json())
+        if side_effect is not None:
+            side_effect()
+        return jsonify({"call": len(app.calls)}), status_code
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _post(client, body, key="key-1", **headers):
+    return client.post("/applications", json=body, headers={"Idempotency-Key": key, **headers})
+
+
+def _record(keys):
+    [record] = keys.docs.values()
+    return record
+
+
+def test_repeated_key_replays_the_stored_response(app, client, keys):
+    first = _post(client, {"residency_id": "r1"})
+    second = _post(client, {"residency_id": "r1"})
+
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json() == {"call": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert len(app.calls) == 1
+    assert _record(keys)["state"] == "done"
+
+
+def test_requests_without_a_key_are_not_recorded(app, client, keys):
+    client.post("/applications", json={"residency_id": "r1"})
+    client.post("/applications", json={"residency_id": "r1"})
+
+    assert len(app.calls) == 2
+    assert keys.docs == {}
+
+
+def test_keys_are_scoped_to_the_caller(app, client):
+    _post(client, {"residency_id": "r1"}, **{"X-User": "alice"})
+    response = _post(client, {"residency_id": "r1"}, **{"X-User": "bob"})
+
+    assert "Idempotent-Replayed" not in response.headers
+    assert len(app.calls) == 2
+
+
+def test_reused_key_with_a_different_body_is_rejected(app, client):
+    _post(client, {"residency_id": "r1"})
+    response = _post(client, {"residency_id": "r2"})
+
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_key_in_progress_is_refused(app, client, keys):
+    app.reply = (201, lambda: responses.append(_post(client, {"residency_id": "r1"})))
+    responses = []
+
+    _post(client, {"residency_id": "r1"})
+
+    assert responses[0].status_code == 409
+    assert len(app.calls) == 1
+
+
+BODY = b'{"residency_id":"r1"}'
+
+
+def _existing_claim(keys, claim, age):
+    # A claim left by another request `age` seconds ago for the same body
+    keys.insert_one({
+        "_id": "student:POST:/applications:key-1",
+        "state": "in_progress",
+        "body_hash": hashlib.sha256(BODY).hexdigest(),
+        "claim": claim,
+        "created_at": datetime.now(timezone.utc) - timedelta(seconds=age),
+        "locked_at": datetime.now(timezone.utc) - timedelta(seconds=age),
+    })
+
+
+def _post_raw(client):
+    return client.post("/applications", data=BODY, content_type="application/json", headers={"Idempotency-Key": "key-1"})
+
+
+def test_expired_claim_is_taken_over(app, client, keys):
+    _existing_claim(keys, "dead-worker", age=IDEMPOTENCY_LEASE + 1)
+
+    response = _post_raw(client)
+
+    assert response.status_code == 201
+    assert len(app.calls) == 1
+    record = _record(keys)
+    assert record["state"] == "done" and record["claim"] != "dead-worker"
+
+
+def test_live_claim_is_not_taken_over(app, client, keys):
+    _existing_claim(keys, "live-worker", age=1)
+
+    response = _post_raw(client)
+
+    assert response.status_code == 409
+    assert app.calls == []
+    assert _record(keys)["claim"] == "live-worker"
+
+
+@pytest.mark.parametrize("status_code", [400, 409, 500])
+def test_error_responses_release_the_key(app, client, keys, status_code):
+    app.reply = (status_code, None)
+    assert _post(client, {"residency_id": "r1"}).status_code == status_code
+    assert keys.docs == {}
+
+    app.reply = (201, None)
+    assert _post(client, {"residency_id": "r1"}).status_code == 201
+    assert len(app.calls) == 2
+
+
+def test_exception_releases_the_key(app, client, keys):
+    def fail():
+        raise RuntimeError("database down")
+
+    app.reply = (201, fail)
+    app.testing = True  # let the exception reach the test client
+    with pytest.raises(RuntimeError):
+        _post(client, {"residency_id": "r1"})
+    assert keys.docs == {}
+
+
+def _take_over(keys):
+    # Another request claims the key while this one is still running
+    record = _record(keys)
+    keys.docs[record["_id"]].update(claim="newer-request")
+
+
+@pytest.mark.parametrize("status_code", [201, 500])
+def test_stale_holder_cannot_touch_a_newer_claim(app, client, keys, status_code):
+    app.reply = (status_code, lambda: _take_over(keys))
+
+    _post(client, {"residency_id": "r1"})
+
+    record = _record(keys)
+    assert record["claim"] == "newer-request"
+    assert record["state"] == "in_progress"  # neither completed nor deleted by the stale holder
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from Models.single_flight import single_flight, get_single_flight_stats
+
+
+def _stats(func):
+    return get_single_flight_stats()[f"{func.__module__}.{func.__qualname__}"]
+
+
+def _call_concurrently(func, arg, followers, wait_for):
+    """
+    Start a leader call, wait until it is inside `func`, join `followers` more
+    calls to it, then let it finish. Returns the (result, error) of every call.
+    """
+    outcomes = [None] * (followers + 1)
+
+    def call(index):
+        try:
+            outcomes[index] = (func(arg), None)
+        except Exception as e:
+            outcomes[index] = (None, e)
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    wait_for(func.entered.is_set)
+    for index in range(1, followers + 1):
+        threads.append(threading.Thread(target=call, args=(index,)))
+        threads[-1].start()
+    wait_for(lambda: _stats(func)["collapsed"] == followers)
+    func.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def _blocking(name, body):
+    # Wrap `body` so the test controls when the leader's query completes;
+    # `name` keeps each test's counters separate
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def getter(arg):
+        calls.append(arg)
+        entered.set()
+        release.wait(5)
+        return body(arg)
+
+    getter.__qualname__ = name
+    getter = single_flight(getter)
+    getter.entered, getter.release, getter.calls = entered, release, calls
+    return getter
+
+
+def test_concurrent_calls_share_one_query(wait_for):
+    getter = _blocking("shared_query", lambda arg: {"id": arg, "blocks": [1, 2]})
+
+    outcomes = _call_concurrently(getter, "r1", followers=4, wait_for=wait_for)
+
+    assert getter.calls == ["r1"]
+    assert [result for result, _ in outcomes] == [{"id": "r1", "blocks": [1, 2]}] * 5
+    assert _stats(getter) == {"calls": 5, "queries": 1, "collapsed": 4}
+
+
+def test_followers_get_their_own_copy(wait_for):
+    getter = _blocking("follower_copy", lambda arg: {"id": arg, "blocks": [1, 2]})
+
+    outcomes = _call_concurrently(getter, "r1", followers=2, wait_for=wait_for)
+
+    results = [result for result, _ in outcomes]
+    assert len({id(result) for result in results}) == 3
+    results[0]["blocks"].append(3)
+    results[1]["id"] = "changed"
+    assert results[2] == {"id": "r1", "blocks": [1, 2]}
+
+
+def test_leader_error_reaches_every_follower(wait_for):
+    def fail(arg):
+        raise ValueError(f"no residency {arg}")
+
+    getter = _blocking("leader_error", fail)
+
+    outcomes = _call_concurrently(getter, "r1", followers=3, wait_for=wait_for)
+
+    assert getter.calls == ["r1"]
+    for result, error in outcomes:
+        assert result is None
+        assert isinstance(error, ValueError) and str(error) == "no residency r1"
+
+
+def test_calls_after_completion_run_again():
+    calls = []
+
+    @single_flight
+    def getter(arg):
+        calls.append(arg)
+        return arg
+
+    assert getter("a") == "a"
+    assert getter("a") == "a"
+    assert calls == ["a", "a"]  # nothing is cached once the call has returned
+    assert _stats(getter) == {"calls": 2, "queries": 2, "collapsed": 0}
+
+
+def test_unhashable_arguments_bypass_coalescing():
+    @single_flight
+    def getter(arg):
+        return len(arg)
+
+    assert getter(["a", "b"]) == 2
+    with pytest.raises(KeyError):
+        _stats(getter)
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+from bench_startup import bench_startup
+
+
+# Wall-clock numbers only mean something against a baseline recorded on the same
+# host, so this gate is opt-in: BENCH_STARTUP=1 python -m pytest tests/test_startup.py
+@pytest.mark.skipif(not os.environ.get("BENCH_STARTUP"), reason="set BENCH_STARTUP=1 to run the cold-start gate")
+def test_cold_start_within_baseline():
+    # Fails on a regression past startup_baseline.json or when the baseline is missing
+    assert bench_startup()
@@ -0,0 +1,153 @@
+import contextlib
+import threading
+import time
+
+import pytest
+from flask import Flask
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from Models import write_behind
+from Models.write_behind import WriteBehindBuffer, _Pending
+
+
+class FakeCollection:
+    """
+    Records insert_many batches; can block a flush or fail chosen documents.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.gate = None  # threading.Event the next insert_many waits on
+        self.write_errors = []  # writeErrors reported by the next insert_many
+        self.error = None  # exception raised by the next insert_many
+
+    def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        if self.gate is not None:
+            gate, self.gate = self.gate, None
+            gate.wait(5)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        write_errors, self.write_errors = self.write_errors, []
+        failed = {write_error["index"] for write_error in write_errors}
+        self.batches.append([doc["n"] for index, doc in enumerate(docs) if index not in failed])
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(docs) - len(failed)})
+
+
+@pytest.fixture
+def reviews(monkeypatch):
+    # Versions come from the counters collection; stub them out to stay database-free
+    monkeypatch.setattr(write_behind, "stamped", lambda collection_name, *docs: contextlib.nullcontext(docs))
+    invalidated = []
+    monkeypatch.setattr(write_behind, "invalidate_stats", invalidated.append)
+    collection = FakeCollection()
+    collection.invalidated = invalidated
+    return collection
+
+
+@pytest.fixture
+def app(reviews):
+    app = Flask(__name__)
+    app.db = {"reviews": reviews}
+    return app
+
+
+def _submit_in_thread(buffer, n, outcomes):
+    def submit():
+        try:
+            outcomes[n] = buffer.submit("reviews", {"n": n})
+        except Exception as e:
+            outcomes[n] = e
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    return thread
+
+
+def test_bulk_write_errors_map_to_their_documents(app, reviews):
+    reviews.write_errors = [
+        {"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"},
+        {"index": 3, "code": 121, "errmsg": "Document failed validation"},
+    ]
+    batch = [_Pending("reviews", {"n": n}) for n in range(4)]
+
+    WriteBehindBuffer(app)._flush(batch)
+
+    assert reviews.batches == [[0, 2]]
+    assert batch[0].error is None and batch[2].error is None
+    assert isinstance(batch[1].error, DuplicateKeyError) and batch[1].error.code == 11000
+    assert type(batch[3].error) is RuntimeError
+    assert all(pending.done.is_set() for pending in batch)
+    assert reviews.invalidated == ["reviews"]  # some inserts went through
+
+
+def test_failed_flush_fails_every_document(app, reviews):
+    reviews.error = ConnectionError("connection reset")
+    batch = [_Pending("reviews", {"n": n}) for n in range(3)]
+
+    WriteBehindBuffer(app)._flush(batch)
+
+    assert all(type(pending.error) is RuntimeError for pending in batch)
+    assert all(pending.done.is_set() for pending in batch)
+    assert reviews.invalidated == []
+
+
+def test_submit_waits_for_its_batch_and_raises_its_error(app, reviews):
+    reviews.write_errors = [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]
+    buffer = WriteBehindBuffer(app, window_ms=0)
+
+    with pytest.raises(DuplicateKeyError):
+        buffer.submit("reviews", {"n": 0})
+    assert buffer.submit("reviews", {"n": 1}) is True
+    assert reviews.batches == [[], [1]]
+    buffer.close()
+
+
+def test_close_drains_the_queue(app, reviews, wait_for):
+    buffer = WriteBehindBuffer(app, max_batch=2, window_ms=5000)
+    gate = reviews.gate = threading.Event()
+    outcomes = {}
+
+    # A full first batch flushes at once and blocks, so the next submit queues up behind it
+    threads = [_submit_in_thread(buffer, n, outcomes) for n in (0, 1)]
+    wait_for(lambda: reviews.gate is None)
+    threads.append(_submit_in_thread(buffer, 2, outcomes))
+    wait_for(lambda: buffer._queue.qsize() == 1)
+    closer = threading.Thread(target=buffer.close)
+    closer.start()
+    wait_for(lambda: buffer._queue.qsize() == 2)  # _STOP is behind the pending insert
+
+    released = time.monotonic()
+    gate.set()
+    closer.join(5)
+    for thread in threads:
+        thread.join(5)
+
+    # _STOP ends the batching window early instead of waiting it out
+    assert time.monotonic() - released < 1
+    assert sorted(reviews.batches[0]) == [0, 1]
+    assert reviews.batches[1:] == [[2]]
+    assert outcomes == {0: True, 1: True, 2: True}
+    assert not buffer._thread.is_alive()
+
+
+def test_full_queue_falls_back_to_synchronous_write(app, reviews, wait_for):
+    buffer = WriteBehindBuffer(app, max_queue=1, enqueue_timeout=0.01)
+    gate = reviews.gate = threading.Event()
+    outcomes = {}
+
+    threads = [_submit_in_thread(buffer, 0, outcomes)]
+    wait_for(lambda: reviews.gate is None)
+    threads.append(_submit_in_thread(buffer, 1, outcomes))
+    wait_for(lambda: buffer._queue.qsize() == 1)
+
+    assert buffer.submit("reviews", {"n": 2}) is False
+
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    buffer.close()
+    assert outcomes == {0: True, 1: True}
+    assert [n for batch in reviews.batches for n in batch] == [0, 1]
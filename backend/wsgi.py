@@ -0,0 +1,6 @@
+from app import create_app
+
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# The app is built once in the master (preload_app) without a database
+# connection; each worker connects after fork in gunicorn.conf.py.
+app = create_app(connect=False)
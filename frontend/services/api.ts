@@ -35,5 +35,24 @@ api.interceptors.response.use(
   }
 )
 
+// Run several API calls in one round trip; GETs are executed concurrently server-side
+export interface BatchRequest {
+  id?: string | number
+  method?: 'GET' | 'POST' | 'PUT' | 'DELETE'
+  path: string
+  body?: unknown
+}
+
+export interface BatchResponse<T = unknown> {
+  id: string | number
+  status: number
+  body: T
+}
+
+export const batch = async (requests: BatchRequest[]): Promise<BatchResponse[]> => {
+  const response = await api.post<{ responses: BatchResponse[] }>('/batch', { requests })
+  return response.data.responses
+}
+
 export default api
 